@@ -0,0 +1,152 @@
+# filename: chat_metrics.py
+# Description: Minimal Prometheus-compatible metrics for the chat server
+#              (counters, histograms and callback gauges rendered in the text
+#              exposition format), plus a streamer that timestamps the first
+#              generated token so prefill and decode can be timed separately.
+#              No prometheus_client dependency; observe() is a bisect and an add.
+
+import bisect
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _fmt(value):
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_fmt(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self.labelnames = tuple(labelnames)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = _labels(self.labelnames + ("le",), labels + (_fmt(bound),))
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                base = _labels(self.labelnames, labels)
+                lines.append(f"{self.name}_sum{base} {_fmt(series[-2])}")
+                lines.append(f"{self.name}_count{base} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time."""
+
+    def __init__(self, name, help, fn):
+        self.name = name
+        self.help = help
+        self.fn = fn
+
+    def render(self):
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {_fmt(value)}"]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, labelnames=()):
+        return self.register(Histogram(name, help, buckets, labelnames))
+
+    def gauge(self, name, help, fn):
+        return self.register(Gauge(name, help, fn))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class FirstTokenTimer:
+    """
+    generate() streamer that records when the prompt was submitted and when the first new
+    token came out (the end of prefill), forwarding everything to an optional inner streamer.
+    """
+
+    def __init__(self, inner=None):
+        self.inner = inner
+        self.started_at = None
+        self.first_token_at = None
+        self.finished_at = None
+
+    def put(self, value):
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+        elif self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        if self.inner is not None:
+            self.inner.put(value)
+
+    def end(self):
+        self.finished_at = time.perf_counter()
+        if self.inner is not None:
+            self.inner.end()
+
+    def timings(self):
+        """(prefill_s, decode_s); decode covers every token after the first."""
+        if self.started_at is None or self.first_token_at is None:
+            return None, None
+        end = self.finished_at or time.perf_counter()
+        return self.first_token_at - self.started_at, end - self.first_token_at
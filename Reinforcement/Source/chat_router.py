@@ -0,0 +1,338 @@
+# filename: chat_router.py
+# Description: Multi-replica serving mode for the chat server. Starts N
+#              server.py worker processes, each pinned to its own slice of CPU
+#              cores, and runs a lightweight front process that forwards /chat
+#              and /chat/stream to the least-loaded worker. Workers that die or
+#              fail to load the model are restarted; POST /admin/restart rolls all
+#              workers one at a time without dropping requests.
+#
+# Usage:
+#   python chat_router.py --workers 4                  # front on :5000, workers on :5101..
+#   python chat_router.py --workers 2 --cores-per-worker 8
+#
+# The front process does not import torch; it only proxies HTTP.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+
+from flask import Flask, Response, jsonify, request
+from flask_cors import CORS
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+
+
+class Worker:
+    """One server.py replica: its process, port, cores and in-flight request count."""
+
+    def __init__(self, index, port, cores, threads, extra_env=None):
+        self.index = index
+        self.port = port
+        self.cores = cores
+        self.threads = threads
+        self.extra_env = extra_env or {}
+        self.process = None
+        self.started_at = None
+        self.ready = False
+        self.draining = False
+        self.in_flight = 0
+        self.served = 0
+        self.restarts = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        env = dict(os.environ, **self.extra_env)
+        env.update(
+            CHAT_PORT=str(self.port),
+            CHAT_CPU_CORES=",".join(map(str, self.cores)),
+            CHAT_TORCH_THREADS=str(self.threads),
+            # Each replica uses its own cores; stop BLAS libraries from oversubscribing them
+            OMP_NUM_THREADS=str(self.threads),
+            MKL_NUM_THREADS=str(self.threads),
+        )
+        self.ready = False
+        self.started_at = time.monotonic()
+        self.process = subprocess.Popen([sys.executable, SERVER_SCRIPT], env=env)
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self, timeout=10):
+        if not self.alive():
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+    def probe(self):
+        """Load status from the worker's /ready endpoint: "ready", "loading", "failed", or None if unreachable."""
+        try:
+            urllib.request.urlopen(self.url + "/ready", timeout=2).close()
+            return "ready"
+        except urllib.error.HTTPError as e:  # 503 with the load progress as JSON
+            try:
+                return json.loads(e.read()).get("status", "loading")
+            except ValueError:
+                return "loading"
+            finally:
+                e.close()
+        except OSError:  # connection refused while the process starts up
+            return None
+
+    def status(self):
+        return {
+            "index": self.index, "port": self.port, "pid": self.process.pid if self.process else None,
+            "cores": self.cores, "threads": self.threads, "alive": self.alive(), "ready": self.ready,
+            "draining": self.draining, "in_flight": self.in_flight, "served": self.served,
+            "restarts": self.restarts,
+        }
+
+
+class WorkerPool:
+    """
+    Least-loaded routing over Worker replicas plus a supervisor thread that marks workers
+    ready, restarts crashed ones and ones whose model load failed, and performs rolling restarts.
+
+    Requests carrying a session_id stick to the worker that served the session before (its
+    prefix cache holds that conversation) unless it is unavailable or much busier than the rest.
+    The session → worker map keeps the max_sessions most recently seen sessions.
+    """
+
+    def __init__(self, workers, start_timeout=600, sticky_slack=2, max_sessions=10000):
+        self.workers = workers
+        self.start_timeout = start_timeout
+        self.sticky_slack = sticky_slack
+        self.max_sessions = max_sessions
+        self._lock = threading.Condition()
+        self._sessions = OrderedDict()
+        self._restart_lock = threading.Lock()
+        self._stopped = False
+        self._supervisor = threading.Thread(target=self._supervise, name="worker-supervisor", daemon=True)
+
+    def start(self):
+        for w in self.workers:
+            w.start()
+        self._supervisor.start()
+
+    def stop(self):
+        self._stopped = True
+        for w in self.workers:
+            w.stop()
+
+    def _available(self):
+        return [w for w in self.workers if w.ready and not w.draining and w.alive()]
+
+    def acquire(self, session_id=None, timeout=30):
+        """Pick a worker for a request and count it as in flight (release() when done)."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while True:
+                candidates = self._available()
+                if candidates:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._lock.wait(remaining)
+
+            # Ties go to the worker that has been idle longest (round-robin-ish)
+            worker = min(candidates, key=lambda w: (w.in_flight, w.served))
+            sticky = self._sessions.get(session_id) if session_id else None
+            if sticky in candidates and sticky.in_flight <= worker.in_flight + self.sticky_slack:
+                worker = sticky
+            if session_id:
+                self._sessions[session_id] = worker
+                self._sessions.move_to_end(session_id)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            worker.in_flight += 1
+            return worker
+
+    def release(self, worker):
+        with self._lock:
+            worker.in_flight -= 1
+            worker.served += 1
+            self._lock.notify_all()
+
+    def _mark_ready(self, worker):
+        with self._lock:
+            worker.ready = True
+            self._lock.notify_all()
+        print(f"[router] worker {worker.index} ready on :{worker.port} cores={worker.cores}")
+
+    def _wait_ready(self, worker):
+        deadline = time.monotonic() + self.start_timeout
+        while time.monotonic() < deadline and worker.alive():
+            state = worker.probe()
+            if state == "ready":
+                self._mark_ready(worker)
+                return True
+            if state == "failed":
+                return False
+            time.sleep(1)
+        return False
+
+    def _restart(self, worker, reason):
+        print(f"[router] worker {worker.index} {reason}; restarting")
+        with self._lock:
+            worker.ready = False
+        worker.stop()
+        worker.restarts += 1
+        worker.start()
+
+    def _supervise(self):
+        # One probe per worker per pass (never waits on a single worker), so a worker that is
+        # still loading does not delay restarting another one that crashed
+        while not self._stopped:
+            for w in self.workers:
+                if self._stopped or w.draining:
+                    continue
+                if not w.alive():
+                    self._restart(w, f"exited (code {w.process.returncode})")
+                elif not w.ready:
+                    state = w.probe()
+                    if state == "ready":
+                        self._mark_ready(w)
+                    elif state == "failed":
+                        self._restart(w, "failed to load the model")
+                    elif time.monotonic() - w.started_at > self.start_timeout:
+                        self._restart(w, f"not ready after {self.start_timeout:.0f}s")
+            time.sleep(1)
+
+    def rolling_restart(self, drain_timeout=300):
+        """Restart workers one at a time: drain, stop, start, wait until ready."""
+        if not self._restart_lock.acquire(blocking=False):
+            return False
+        try:
+            for w in self.workers:
+                with self._lock:
+                    w.draining = True
+                    deadline = time.monotonic() + drain_timeout
+                    while w.in_flight and time.monotonic() < deadline:
+                        self._lock.wait(deadline - time.monotonic())
+                    w.ready = False
+                w.stop()
+                w.restarts += 1
+                w.start()  # still draining: the supervisor leaves it alone until it is ready
+                self._wait_ready(w)
+                w.draining = False
+            return True
+        finally:
+            self._restart_lock.release()
+
+    def status(self):
+        with self._lock:
+            return [w.status() for w in self.workers]
+
+
+def split_cores(n_workers, cores_per_worker=None):
+    """Assign disjoint slices of this process's CPU cores to each worker."""
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count()))
+    per = cores_per_worker or max(1, len(cores) // n_workers)
+    slices = [cores[i * per:(i + 1) * per] for i in range(n_workers)]
+    # Not enough cores for disjoint slices: share them round-robin
+    return [s or cores[i % len(cores):i % len(cores) + 1] for i, s in enumerate(slices)]
+
+
+def create_app(pool):
+    app = Flask(__name__)
+    CORS(app)
+
+    def forward(path):
+        data = request.get_data()
+        session_id = (request.get_json(silent=True) or {}).get("session_id")
+        worker = pool.acquire(session_id)
+        if worker is None:
+            return jsonify({"error": "No model worker is available."}), 503
+
+        upstream_req = urllib.request.Request(
+            worker.url + path, data=data, method="POST",
+            headers={"Content-Type": request.headers.get("Content-Type", "application/json")},
+        )
+        try:
+            upstream = urllib.request.urlopen(upstream_req, timeout=600)
+        except urllib.error.HTTPError as e:
+            body = e.read()
+            pool.release(worker)
+            return Response(body, status=e.code, content_type=e.headers.get("Content-Type"))
+        except OSError as e:
+            pool.release(worker)
+            return jsonify({"error": f"Worker {worker.index} failed: {e}"}), 502
+
+        def body():
+            # Pass chunks through as they arrive so SSE token events are not buffered
+            try:
+                while True:
+                    chunk = upstream.read1(8192)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                upstream.close()
+                pool.release(worker)
+
+        headers = {"X-Chat-Worker": str(worker.index)}
+        if upstream.headers.get("Cache-Control"):
+            headers["Cache-Control"] = upstream.headers["Cache-Control"]
+        return Response(body(), status=upstream.status,
+                        content_type=upstream.headers.get("Content-Type"), headers=headers)
+
+    @app.route('/chat', methods=['POST'])
+    def chat():
+        return forward('/chat')
+
+    @app.route('/chat/stream', methods=['POST'])
+    def chat_stream():
+        return forward('/chat/stream')
+
+    @app.route('/workers', methods=['GET'])
+    def workers():
+        return jsonify(pool.status())
+
+    @app.route('/admin/restart', methods=['POST'])
+    def restart():
+        if pool._restart_lock.locked():
+            return jsonify({"error": "A restart is already in progress."}), 409
+        threading.Thread(target=pool.rolling_restart, daemon=True).start()
+        return jsonify({"status": "restarting"}), 202
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several chat model workers behind one endpoint")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--cores-per-worker", type=int, default=None,
+                        help="default: available cores / workers")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--worker-base-port", type=int, default=5101)
+    parser.add_argument("--start-timeout", type=float, default=600, help="seconds to wait for a worker to load")
+    args = parser.parse_args()
+
+    workers = [
+        Worker(i, args.worker_base_port + i, cores, len(cores))
+        for i, cores in enumerate(split_cores(args.workers, args.cores_per_worker))
+    ]
+    pool = WorkerPool(workers, start_timeout=args.start_timeout)
+    pool.start()
+    try:
+        create_app(pool).run(host='0.0.0.0', port=args.port, threaded=True)
+    finally:
+        pool.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+# filename: chat_scheduler.py
+# Description: Dynamic batching queue for the chat server. Concurrent /chat
+#              requests are queued, grouped into batches by arrival window,
+#              generation parameters and prompt length, and run through a
+#              single batched generate() call.
+
+import threading
+import time
+from concurrent.futures import Future
+
+
+class ChatRequest:
+    """
+    One queued generation request. `future` resolves to the run_batch() result for it.
+    `on_text`, if set, receives generated text chunks as they are produced (streaming).
+    `exclusive` requests always run in a batch of their own (e.g. when they reuse a cached prefix).
+    `meta` is free-form data for run_batch().
+    """
+
+    def __init__(self, input_ids, gen_kwargs, on_text=None, exclusive=False, meta=None):
+        self.input_ids = input_ids
+        self.gen_kwargs = gen_kwargs
+        self.on_text = on_text
+        self.exclusive = exclusive
+        self.meta = meta or {}
+        self.gen_key = tuple(sorted(gen_kwargs.items()))
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+        self.started_at = None
+
+    def __len__(self):
+        return len(self.input_ids)
+
+
+class BatchScheduler:
+    """
+    Collects requests from many Flask threads and feeds them to one worker thread in batches.
+
+    run_batch(requests) must return one result per request, in order. A batch is closed when
+    it reaches max_batch_size or when the oldest queued request has waited max_wait_ms.
+    Only requests with identical generation parameters are batched together, and prompts
+    whose length differs from the oldest request by more than length_tolerance tokens are
+    left for a later batch so that left-padding waste stays bounded.
+    """
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=20, length_tolerance=128):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.length_tolerance = length_tolerance
+
+        self._queue = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = {"requests": 0, "batches": 0, "batched_requests": 0, "max_batch": 0}
+
+        self._thread = threading.Thread(target=self._loop, name="batch-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, input_ids, gen_kwargs, on_text=None, exclusive=False, meta=None):
+        """Queue a prompt (token ids) and return a Future for its result."""
+        request = ChatRequest(input_ids, gen_kwargs, on_text, exclusive, meta)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed.")
+            self._queue.append(request)
+            self.stats["requests"] += 1
+            self._cond.notify()
+        return request.future
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    def _compatible(self, anchor):
+        if anchor.exclusive:
+            return [anchor]
+        return [r for r in self._queue
+                if not r.exclusive and r.gen_key == anchor.gen_key
+                and abs(len(r) - len(anchor)) <= self.length_tolerance]
+
+    def _next_batch(self):
+        """Block until a batch is ready, then remove and return it (None once closed)."""
+        with self._cond:
+            while True:
+                if not self._queue:
+                    if self._closed:
+                        return None
+                    self._cond.wait()
+                    continue
+
+                # The oldest request anchors the batch so nothing starves
+                anchor = self._queue[0]
+                candidates = self._compatible(anchor)
+                deadline = anchor.enqueued_at + self.max_wait
+                remaining = deadline - time.perf_counter()
+                if (not anchor.exclusive and len(candidates) < self.max_batch_size
+                        and remaining > 0 and not self._closed):
+                    self._cond.wait(remaining)
+                    continue
+
+                # Prefer prompts closest in length to the anchor to minimise padding
+                candidates.sort(key=lambda r: abs(len(r) - len(anchor)))
+                batch = [anchor] + [r for r in candidates if r is not anchor][:self.max_batch_size - 1]
+                chosen = set(map(id, batch))
+                self._queue = [r for r in self._queue if id(r) not in chosen]
+                return batch
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            now = time.perf_counter()
+            for request in batch:
+                request.started_at = now
+            self.stats["batches"] += 1
+            self.stats["batched_requests"] += len(batch)
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+
+            try:
+                results = self.run_batch(batch)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            for request, result in zip(batch, results):
+                request.future.set_result(result)
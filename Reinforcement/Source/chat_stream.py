@@ -0,0 +1,89 @@
+# filename: chat_stream.py
+# Description: Token streaming helpers for the chat server. BatchTokenStreamer
+#              plugs into model.generate(streamer=...) for a whole batch and
+#              forwards each row's newly decoded text to that request's
+#              TokenStream, which the /chat/stream handler iterates as SSE.
+
+import queue
+import time
+
+
+class TokenStream:
+    """Thread-safe iterator of text chunks for one request (like transformers' TextIteratorStreamer)."""
+
+    _END = object()
+
+    def __init__(self, timeout=None):
+        self._queue = queue.Queue()
+        self.timeout = timeout
+        self.created_at = time.perf_counter()
+        self.first_token_at = None
+
+    def put(self, text):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self._queue.put(text)
+
+    def close(self):
+        self._queue.put(self._END)
+
+    @property
+    def ttft(self):
+        """Seconds from stream creation (request arrival) to the first emitted text, or None."""
+        return None if self.first_token_at is None else self.first_token_at - self.created_at
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get(timeout=self.timeout)
+            if item is self._END:
+                return
+            yield item
+
+
+class BatchTokenStreamer:
+    """
+    Streamer for batched generate(): splits each decoding step's (batch,) token tensor by row,
+    decodes incrementally and calls the row's callback with the new text.
+
+    callbacks[i] may be None for rows nobody is listening to. Text that ends in an incomplete
+    multi-byte character is held back until the next token completes it.
+    """
+
+    def __init__(self, tokenizer, callbacks, stop_token_ids=()):
+        self.tokenizer = tokenizer
+        self.callbacks = callbacks
+        self.stop_token_ids = set(stop_token_ids)
+        self._tokens = [[] for _ in callbacks]
+        self._emitted = [0] * len(callbacks)
+        self._finished = [cb is None for cb in callbacks]
+        self._prompt_seen = False
+
+    def put(self, value):
+        # generate() first passes the prompt ids; only the following calls carry new tokens
+        if not self._prompt_seen:
+            self._prompt_seen = True
+            return
+        tokens = value.reshape(len(self.callbacks), -1).tolist()
+        for i, row in enumerate(tokens):
+            if self._finished[i]:
+                continue
+            for token in row:
+                if token in self.stop_token_ids:
+                    self._finished[i] = True
+                    break
+                self._tokens[i].append(token)
+            self._flush(i)
+
+    def _flush(self, i, final=False):
+        text = self.tokenizer.decode(self._tokens[i], skip_special_tokens=True)
+        if not final and text.endswith("�"):
+            return
+        new = text[self._emitted[i]:]
+        if new:
+            self._emitted[i] = len(text)
+            self.callbacks[i](new)
+
+    def end(self):
+        for i, cb in enumerate(self.callbacks):
+            if cb is not None:
+                self._flush(i, final=True)
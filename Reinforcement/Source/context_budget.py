@@ -0,0 +1,144 @@
+# filename: context_budget.py
+# Description: Keeps chat prompts within a token budget. Per-message token counts
+#              are cached, so a long lesson is not re-tokenised every turn; when the
+#              history no longer fits, the oldest turns are dropped (the system
+#              prompt is always kept) and the number of tokens saved is reported.
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def message_key(message):
+    """Stable digest of one message's role and content."""
+    role, content = message.get("role", "user"), str(message.get("content", ""))
+    return hashlib.sha1(f"{role}\0{content}".encode("utf-8")).digest()
+
+
+class TokenCountCache:
+    """LRU map of (role, content) -> token count, including the chat template's per-message overhead."""
+
+    def __init__(self, tokenizer, max_entries=8192):
+        self.tokenizer = tokenizer
+        self.max_entries = max_entries
+        self._counts = OrderedDict()
+        self._overhead = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _template_overhead(self, role):
+        # Tokens the template adds around one message (role markers, turn separators)
+        if role not in self._overhead:
+            text = "x"
+            try:
+                wrapped = len(self.tokenizer.apply_chat_template([{"role": role, "content": text}], tokenize=True))
+                self._overhead[role] = max(0, wrapped - len(self.tokenizer.encode(text, add_special_tokens=False)))
+            except Exception:
+                # Templates that reject a lone system/assistant message
+                self._overhead[role] = 8
+        return self._overhead[role]
+
+    def count(self, message):
+        role, content = message.get("role", "user"), str(message.get("content", ""))
+        key = message_key(message)
+        with self._lock:
+            n = self._counts.get(key)
+            if n is not None:
+                self._counts.move_to_end(key)
+                self.stats["hits"] += 1
+                return n
+            self.stats["misses"] += 1
+        n = len(self.tokenizer.encode(content, add_special_tokens=False)) + self._template_overhead(role)
+        with self._lock:
+            self._counts[key] = n
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return n
+
+
+class ContextBudget:
+    """
+    Fits a message history into max_prompt_tokens.
+
+    Leading system messages and the latest message are always kept. When the history is
+    over budget, whole turns are dropped from the front until it fits within
+    trim_to * max_prompt_tokens; trimming below the limit (rather than just under it) means the
+    next several turns keep the same prefix, so the prefix cache can keep reusing it. For
+    requests with a session_id the cut point is remembered together with a digest of the first
+    kept message, and reused only while the full history is over budget and that message is
+    still at the cut. A history that fits is never trimmed.
+    """
+
+    def __init__(self, tokenizer, max_prompt_tokens=2048, trim_to=0.75, max_sessions=4096):
+        self.tokenizer = tokenizer
+        self.max_prompt_tokens = max_prompt_tokens
+        self.trim_to = trim_to
+        self.max_sessions = max_sessions
+        self.counts = TokenCountCache(tokenizer)
+        self._cuts = OrderedDict()  # session_id -> (non-system messages dropped, message_key of the first kept)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "trimmed": 0, "tokens_saved": 0}
+
+    @staticmethod
+    def _split(messages):
+        n_system = 0
+        while n_system < len(messages) and messages[n_system].get("role") == "system":
+            n_system += 1
+        return messages[:n_system], messages[n_system:]
+
+    @staticmethod
+    def _turn_start(turns, cut):
+        # Start the kept history on a user message so roles still alternate
+        while cut < len(turns) - 1 and turns[cut].get("role") != "user":
+            cut += 1
+        return cut
+
+    def fit(self, messages, session_id=None):
+        """(kept messages, report) where report has dropped_messages / tokens_saved / prompt_tokens."""
+        system, turns = self._split(messages)
+        sizes = [self.counts.count(m) for m in turns]
+        fixed = sum(self.counts.count(m) for m in system)
+        total = fixed + sum(sizes)
+
+        cut = 0
+        if total > self.max_prompt_tokens:
+            with self._lock:
+                stored = self._cuts.get(session_id) if session_id else None
+            # Keep the previous cut only if the same message still starts the kept history
+            if stored is not None and stored[0] < len(turns) and message_key(turns[stored[0]]) == stored[1]:
+                cut = stored[0]
+            cut = self._turn_start(turns, cut)
+            if fixed + sum(sizes[cut:]) > self.max_prompt_tokens:
+                target = int(self.max_prompt_tokens * self.trim_to)
+                kept = fixed + sum(sizes[cut:])
+                while cut < len(turns) - 1 and kept > target:
+                    kept -= sizes[cut]
+                    cut += 1
+                cut = self._turn_start(turns, cut)
+
+        if session_id:
+            with self._lock:
+                if cut:
+                    self._cuts[session_id] = (cut, message_key(turns[cut]))
+                    self._cuts.move_to_end(session_id)
+                    while len(self._cuts) > self.max_sessions:
+                        self._cuts.popitem(last=False)
+                else:
+                    self._cuts.pop(session_id, None)
+
+        kept_tokens = fixed + sum(sizes[cut:])
+        report = {
+            "dropped_messages": cut,
+            "tokens_saved": total - kept_tokens,
+            "prompt_tokens_estimate": kept_tokens,
+        }
+        with self._lock:
+            self.stats["requests"] += 1
+            if cut:
+                self.stats["trimmed"] += 1
+                self.stats["tokens_saved"] += report["tokens_saved"]
+        return system + turns[cut:], report
+
+    def summary(self):
+        with self._lock:
+            return dict(self.stats, sessions=len(self._cuts), count_cache=dict(self.counts.stats))
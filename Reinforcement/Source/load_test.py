@@ -0,0 +1,108 @@
+# filename: load_test.py
+# Description: Load test for the chat server. Starts N concurrent clients that
+#              each send a few /chat requests and reports request throughput,
+#              generated tokens/sec and latency percentiles.
+#
+# Usage:
+#   python server.py                                   # in another terminal
+#   python load_test.py --clients 30 --requests 3
+#   CHAT_MAX_BATCH_SIZE=1 python server.py             # baseline without batching
+#   python load_test.py --session                      # multi-turn chats with session_id, like the web client
+#
+# Prefix reuse vs batching (run the same --session load against each server setting):
+#   CHAT_PREFIX_EXCLUSIVE_MIN_TOKENS=0 python server.py    # every prefix hit runs alone
+#   python server.py                                       # prefix hits batch unless idle / long prefix
+#   CHAT_PREFIX_CACHE_MB=0 python server.py                # no prefix reuse at all
+
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.request
+import uuid
+
+PROMPTS = [
+    "What is a tractrix curve?",
+    "Explain reinforcement learning in one paragraph.",
+    "Give me three tips for studying calculus.",
+    "What is the derivative of sin(x)?",
+    "Summarise Newton's laws of motion.",
+    "Why is the sky blue?",
+]
+
+
+def send_chat(url, messages, max_new_tokens, timeout, session_id=None):
+    body = {"messages": messages, "max_new_tokens": max_new_tokens}
+    if session_id:
+        body["session_id"] = session_id
+    body = json.dumps(body).encode()
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return json.loads(resp.read())
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for the chat server")
+    parser.add_argument("--url", default="http://127.0.0.1:5000/chat")
+    parser.add_argument("--clients", type=int, default=30)
+    parser.add_argument("--requests", type=int, default=3, help="requests per client")
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--session", action="store_true",
+                        help="each client holds one conversation (growing history + session_id), like the web client")
+    args = parser.parse_args()
+
+    latencies, tokens, cached_tokens, errors = [], [], [], []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(args.clients)
+
+    def client(idx):
+        session_id = f"load-{idx}-{uuid.uuid4().hex[:8]}" if args.session else None
+        history = []
+        start_barrier.wait()  # all clients start together
+        for i in range(args.requests):
+            prompt = PROMPTS[(idx + i) % len(PROMPTS)]
+            messages = history + [{"role": "user", "content": prompt}]
+            t0 = time.perf_counter()
+            try:
+                data = send_chat(args.url, messages, args.max_new_tokens, args.timeout, session_id)
+            except Exception as e:
+                with lock:
+                    errors.append(repr(e))
+                continue
+            if args.session:
+                history = messages + [{"role": "assistant", "content": data.get("response", "")}]
+            usage = data.get("usage", {})
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+                tokens.append(usage.get("completion_tokens", 0))
+                cached_tokens.append(usage.get("cached_prompt_tokens", 0))
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    print(f"clients={args.clients} requests={len(latencies)} errors={len(errors)} elapsed={elapsed:.1f}s"
+          f"{' (sessions)' if args.session else ''}")
+    if latencies:
+        print(f"throughput: {len(latencies) / elapsed:.2f} req/s, {sum(tokens) / elapsed:.1f} generated tokens/s")
+        print(f"latency: mean {statistics.mean(latencies):.2f}s  p50 {percentile(latencies, 0.5):.2f}s  "
+              f"p90 {percentile(latencies, 0.9):.2f}s  p99 {percentile(latencies, 0.99):.2f}s")
+        reused = sum(1 for n in cached_tokens if n)
+        print(f"reused prompt tokens (prefix cache): {sum(cached_tokens)} on {reused}/{len(cached_tokens)} requests")
+    for err in errors[:5]:
+        print("error:", err)
+
+
+if __name__ == '__main__':
+    main()
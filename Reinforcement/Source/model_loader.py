@@ -0,0 +1,181 @@
+# filename: model_loader.py
+# Description: Loads the chat model in a selectable precision / backend mode.
+#              Shared by server.py and precision_bench.py.
+#
+# Modes:
+#   float32  - full precision (reference quality, most memory)
+#   bfloat16 - half the weight memory; fast on CPUs with AVX512-BF16/AMX
+#   int8     - float32 weights with every nn.Linear dynamically quantised to int8 (CPU only)
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+PRECISION_MODES = ("float32", "bfloat16", "int8")
+
+
+def resident_memory_mb():
+    """Current resident set size of this process in MB (Linux /proc, else peak RSS)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def parse_cores(spec):
+    """"0-3,8,10-11" -> [0, 1, 2, 3, 8, 10, 11]"""
+    cores = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        lo, _, hi = part.partition("-")
+        cores.extend(range(int(lo), int(hi or lo) + 1))
+    return cores
+
+
+def format_cores(cores):
+    return ",".join(map(str, cores))
+
+
+def pin_process(cores=None, threads=None):
+    """
+    Restrict this process to the given CPU cores (Linux) and set torch's intra-op thread count
+    (defaults to one thread per pinned core). Returns the effective (cores, threads).
+    """
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    if hasattr(os, "sched_getaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+    threads = threads or (len(cores) if cores else None)
+    if threads:
+        torch.set_num_threads(threads)
+    return cores, torch.get_num_threads()
+
+
+def load_tokenizer(model_path):
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    tokenizer.padding_side = "left"  # decoder-only models must be left-padded for batched generation
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    return tokenizer
+
+
+def load_model(model_path, precision="float32", compile=False, threads=None):
+    """
+    Load a causal LM in the given precision mode. Returns (model, info) where info records
+    the effective settings and load time. int8 always runs on the CPU; the other modes use
+    the GPU if one is available.
+    """
+    if precision not in PRECISION_MODES:
+        raise ValueError(f"Unknown precision {precision!r}; expected one of {PRECISION_MODES}")
+    if threads:
+        torch.set_num_threads(threads)
+
+    start = time.perf_counter()
+    if precision == "int8":
+        # Dynamic quantisation works on float32 CPU modules: weights are stored as int8,
+        # activations are quantised on the fly per batch
+        model = AutoModelForCausalLM.from_pretrained(model_path, dtype=torch.float32, device_map="cpu")
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    else:
+        model = AutoModelForCausalLM.from_pretrained(
+            model_path,
+            dtype=getattr(torch, precision),
+            device_map="auto"  # Automatically use GPU if available
+        )
+    model.eval()
+
+    if compile:
+        # Compiles the forward pass lazily; the first generate() call pays the compile time
+        model.forward = torch.compile(model.forward, dynamic=True)
+
+    info = {
+        "precision": precision,
+        "compile": bool(compile),
+        "device": str(model.device),
+        "threads": torch.get_num_threads(),
+        "load_s": round(time.perf_counter() - start, 2),
+    }
+    return model, info
+
+
+def precision_from_env():
+    """(precision, compile) from CHAT_PRECISION / CHAT_TORCH_COMPILE."""
+    precision = os.environ.get("CHAT_PRECISION", "float32").lower()
+    compile = os.environ.get("CHAT_TORCH_COMPILE", "0").lower() in ("1", "true", "yes")
+    return precision, compile
+
+
+class LoadProgress:
+    """
+    Thread-safe record of a model load for /health and /ready: the current stage, the
+    fraction of stages done, per-stage timings (the cold-start breakdown) and any error.
+    """
+
+    def __init__(self, stages=("tokenizer", "weights", "warmup")):
+        self.stages = stages
+        self.started_at = time.perf_counter()
+        self._lock = threading.Lock()
+        self.status = "loading"
+        self.stage = None
+        self.attempt = 0
+        self.error = None
+        self.timings = {}
+        self.info = {}
+
+    @contextmanager
+    def step(self, name):
+        with self._lock:
+            self.stage = name
+        t0 = time.perf_counter()
+        yield
+        with self._lock:
+            self.timings[name] = round(time.perf_counter() - t0, 3)
+
+    def retry(self):
+        with self._lock:
+            self.attempt += 1
+            self.status = "loading"
+            self.error = None
+            self.timings = {}
+
+    def ready(self, **info):
+        with self._lock:
+            self.status = "ready"
+            self.stage = None
+            self.info = info
+            self.timings["cold_start"] = round(time.perf_counter() - self.started_at, 3)
+
+    def fail(self, error, final):
+        with self._lock:
+            self.error = f"{type(error).__name__}: {error}"
+            if final:
+                self.status = "failed"
+
+    @property
+    def is_ready(self):
+        return self.status == "ready"
+
+    def snapshot(self):
+        with self._lock:
+            done = sum(1 for name in self.stages if name in self.timings)
+            return {
+                "status": self.status,
+                "stage": self.stage,
+                "progress": round(done / len(self.stages), 2),
+                "attempt": self.attempt,
+                "elapsed_s": round(time.perf_counter() - self.started_at, 1),
+                "timings_s": dict(self.timings),
+                "error": self.error,
+                **self.info,
+            }
@@ -0,0 +1,131 @@
+# filename: precision_bench.py
+# Description: Micro-benchmark for the chat model's precision modes. Each mode is
+#              loaded in a fresh subprocess (so memory numbers do not mix) and
+#              reports load time, resident memory, generation tokens/sec and a
+#              quality sanity check against the float32 reference: greedy-output
+#              token agreement and perplexity on a fixed passage.
+#
+# Usage:
+#   python precision_bench.py                                # float32, bfloat16, int8
+#   python precision_bench.py --modes float32 int8 --compile --threads 8
+
+import argparse
+import json
+import math
+import subprocess
+import sys
+import time
+
+PROMPTS = [
+    "What is a tractrix curve?",
+    "Explain reinforcement learning in one paragraph.",
+    "What is the derivative of sin(x)?",
+]
+
+REFERENCE_TEXT = (
+    "A tractrix is the curve along which an object moves, under the influence of friction, "
+    "when pulled on a horizontal plane by a line segment attached to a puller that moves at a "
+    "right angle to the initial line between the object and the puller at an infinitesimal speed."
+)
+
+
+def run_mode(args):
+    """Benchmark one mode in this process and return a result dict."""
+    import torch
+    from model_loader import load_model, load_tokenizer, resident_memory_mb
+
+    rss_before = resident_memory_mb()
+    tokenizer = load_tokenizer(args.model)
+    model, info = load_model(args.model, args.mode, args.compile, args.threads)
+    result = dict(info, rss_mb=round(resident_memory_mb() - rss_before, 1))
+
+    outputs, gen_tokens, gen_time, first_s = [], 0, 0.0, None
+    with torch.inference_mode():
+        for i, prompt in enumerate(PROMPTS * args.repeat):
+            prompt_ids = tokenizer.apply_chat_template(
+                [{"role": "user", "content": prompt}], tokenize=True, add_generation_prompt=True
+            )
+            input_ids = torch.tensor([prompt_ids], device=model.device)
+            t0 = time.perf_counter()
+            output = model.generate(input_ids, max_new_tokens=args.max_new_tokens, do_sample=False,
+                                    pad_token_id=tokenizer.pad_token_id)
+            elapsed = time.perf_counter() - t0
+            new_tokens = output[0, input_ids.shape[1]:].tolist()
+            if i == 0:
+                # First call includes warmup (and compilation with --compile); reported separately
+                first_s = elapsed
+            else:
+                gen_tokens += len(new_tokens)
+                gen_time += elapsed
+            if i < len(PROMPTS):
+                outputs.append(new_tokens)
+
+        ids = tokenizer(REFERENCE_TEXT, return_tensors="pt").input_ids.to(model.device)
+        loss = model(ids, labels=ids).loss.float().item()
+
+    result.update(
+        first_generate_s=round(first_s, 2),
+        tokens_per_s=round(gen_tokens / gen_time, 1) if gen_time else None,
+        peak_rss_mb=round(resident_memory_mb(), 1),
+        perplexity=round(math.exp(loss), 3),
+        outputs=outputs,
+        sample=tokenizer.decode(outputs[0], skip_special_tokens=True)[:80],
+    )
+    return result
+
+
+def token_agreement(a, b):
+    """Fraction of positions (over the longer output) where two greedy outputs agree."""
+    n = max(len(a), len(b))
+    if n == 0:
+        return 1.0
+    return sum(x == y for x, y in zip(a, b)) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the chat model's precision modes")
+    parser.add_argument("--model", default="./google/gemma-3-1b-it")
+    parser.add_argument("--modes", nargs="+", default=["float32", "bfloat16", "int8"])
+    parser.add_argument("--compile", action="store_true", help="also torch.compile each mode")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=2, help="passes over the prompts")
+    parser.add_argument("--mode", help=argparse.SUPPRESS)  # internal: run a single mode and print JSON
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args)))
+        return
+
+    results = []
+    for mode in args.modes:
+        cmd = [sys.executable, __file__, "--mode", mode, "--model", args.model,
+               "--max-new-tokens", str(args.max_new_tokens), "--repeat", str(args.repeat)]
+        if args.compile:
+            cmd.append("--compile")
+        if args.threads:
+            cmd += ["--threads", str(args.threads)]
+        print(f"[{mode}] running...", flush=True)
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"[{mode}] failed:\n{proc.stderr[-2000:]}")
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    if not results:
+        return
+    reference = next((r for r in results if r["precision"] == "float32"), results[0])
+    print(f"\n{'mode':<10}{'load s':>8}{'rss MB':>9}{'1st gen s':>11}{'tok/s':>8}{'ppl':>9}{'agree':>8}")
+    for r in results:
+        agree = sum(token_agreement(a, b) for a, b in zip(r["outputs"], reference["outputs"])) / len(r["outputs"])
+        name = r["precision"] + ("+c" if r["compile"] else "")
+        print(f"{name:<10}{r['load_s']:>8.2f}{r['rss_mb']:>9.0f}{r['first_generate_s']:>11.2f}"
+              f"{r['tokens_per_s'] or 0:>8.1f}{r['perplexity']:>9.3f}{agree:>8.0%}")
+    for r in results:
+        print(f"  {r['precision']}: {r['sample']!r}")
+    print(f"\nagree = greedy-output token agreement with {reference['precision']}; "
+          f"a large perplexity jump or low agreement means the mode hurts answer quality.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+# filename: prefix_cache.py
+# Description: Conversation prefix cache for the chat server. Keeps the model's
+#              past key/values for earlier turns so that the next turn of the
+#              same conversation only prefills the tokens that are new.
+
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def layer_tensors(past_key_values):
+    """[(keys, values), ...] per layer of a transformers Cache object (or legacy tuple of pairs)."""
+    layers = getattr(past_key_values, "layers", None)
+    if layers is not None:
+        return [(getattr(layer, "keys", None), getattr(layer, "values", None)) for layer in layers]
+    if hasattr(past_key_values, "key_cache"):
+        return list(zip(past_key_values.key_cache, past_key_values.value_cache))
+    return [tuple(layer[:2]) for layer in past_key_values]
+
+
+def cache_nbytes(past_key_values):
+    """Memory held by a transformers Cache object (or legacy tuple of (key, value) pairs)."""
+    tensors = [t for pair in layer_tensors(past_key_values) for t in pair]
+    return sum(t.numel() * t.element_size() for t in tensors if t is not None and hasattr(t, "numel"))
+
+
+def slice_batch_cache(past_key_values, row, start, length):
+    """
+    A standalone single-sequence DynamicCache holding positions [start, start + length) of one
+    row of a batched cache (start skips that row's left padding). Returns None if some layer
+    does not hold the full sequence (e.g. a sliding-window layer that has already rolled).
+    """
+    from transformers import DynamicCache
+
+    seq_len = past_key_values.get_seq_length()
+    pairs = layer_tensors(past_key_values)
+    if any(k is None or k.shape[-2] != seq_len for k, _ in pairs):
+        return None
+    cache = DynamicCache()
+    for layer_idx, (keys, values) in enumerate(pairs):
+        cache.update(keys[row:row + 1, :, start:start + length].clone(),
+                     values[row:row + 1, :, start:start + length].clone(), layer_idx)
+    return cache
+
+
+def common_prefix_length(a, b):
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class PrefixEntry:
+    def __init__(self, key, token_ids, past_key_values):
+        self.key = key
+        self.token_ids = tuple(token_ids)
+        self.past_key_values = past_key_values
+        self.nbytes = cache_nbytes(past_key_values)
+
+
+class PrefixCache:
+    """
+    LRU cache of (token ids, past key/values) bounded by max_bytes.
+
+    Entries are stored under the conversation's session id when the client sends one,
+    otherwise under a hash of their token ids. A lookup first tries the session's own entry
+    and then falls back to the entry with the longest common token prefix (for example
+    the same system prompt used by every student). Stored caches are never modified:
+    materialize() hands out a cropped copy that generate() may extend in place.
+    """
+
+    def __init__(self, max_bytes, min_prefix_tokens=16):
+        self.max_bytes = max_bytes
+        self.min_prefix_tokens = min_prefix_tokens
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "reused_tokens": 0, "crop_failures": 0, "evictions": 0}
+
+    @staticmethod
+    def key_for(token_ids, session_id=None):
+        if session_id:
+            return f"session:{session_id}"
+        return "prefix:" + hashlib.sha1(repr(tuple(token_ids)).encode()).hexdigest()
+
+    def lookup(self, input_ids, session_id=None):
+        """Best reusable (entry, prefix_len) for a prompt, or (None, 0)."""
+        with self._lock:
+            best, best_len = None, 0
+            own = self._entries.get(self.key_for(None, session_id)) if session_id else None
+            candidates = [own] if own is not None else self._entries.values()
+            for entry in candidates:
+                n = common_prefix_length(entry.token_ids, input_ids)
+                if n > best_len:
+                    best, best_len = entry, n
+
+            # At least one prompt token must remain to be prefilled
+            best_len = min(best_len, len(input_ids) - 1)
+            if best is None or best_len < self.min_prefix_tokens:
+                self.stats["misses"] += 1
+                return None, 0
+            self._entries.move_to_end(best.key)
+            self.stats["hits"] += 1
+            return best, best_len
+
+    def materialize(self, entry, prefix_len):
+        """A private copy of entry's cache cropped to prefix_len tokens, or None if it cannot be cropped."""
+        past = copy.deepcopy(entry.past_key_values)
+        try:
+            if past.get_seq_length() > prefix_len:
+                past.crop(prefix_len)
+        except Exception:
+            # e.g. sliding-window layers that have already rolled past prefix_len
+            with self._lock:
+                self.stats["crop_failures"] += 1
+            return None
+        with self._lock:
+            self.stats["reused_tokens"] += prefix_len
+        return past
+
+    def store(self, key, token_ids, past_key_values):
+        entry = PrefixEntry(key, token_ids, past_key_values)
+        if entry.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old.nbytes
+            self._entries[key] = entry
+            self.total_bytes += entry.nbytes
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted.nbytes
+                self.stats["evictions"] += 1
+
+    def __len__(self):
+        return len(self._entries)
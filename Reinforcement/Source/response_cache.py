@@ -0,0 +1,131 @@
+# filename: response_cache.py
+# Description: Response cache for the chat server. Replies are cached under a
+#              key made from the normalised message history and the generation
+#              parameters, so a class full of students asking the same first
+#              question only triggers one generation. Bounded by entry count and
+#              bytes (LRU) with a TTL, optionally persisted to a sqlite file.
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_text(text, casefold=True):
+    """NFKC-normalise and collapse whitespace; optionally case-insensitive."""
+    text = unicodedata.normalize("NFKC", text)
+    text = " ".join(text.split())
+    return text.casefold() if casefold else text
+
+
+def cache_key(messages, gen_kwargs, casefold=True):
+    """Stable hash of (normalised messages, generation parameters)."""
+    normalized = [
+        [m.get("role", "user"), normalize_text(str(m.get("content", "")), casefold)]
+        for m in messages
+    ]
+    payload = json.dumps([normalized, sorted(gen_kwargs.items())], ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of JSON-serialisable results, bounded by max_entries and max_bytes.
+
+    If `path` is given, entries are also written to a sqlite database and loaded back
+    (skipping expired ones) when the cache is created, so a restarted server stays warm.
+    Several worker processes may share the file: writers wait up to busy_timeout_s for the
+    database lock, and a write that still fails is logged and skipped (the in-memory entry
+    is kept), so a cache write never fails the request.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=16 * 1024 * 1024, ttl_s=3600, path=None, busy_timeout_s=5.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()  # key -> (expires_at, nbytes, value)
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0, "db_errors": 0}
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, timeout=busy_timeout_s, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses "
+                             "(key TEXT PRIMARY KEY, expires_at REAL, value TEXT)")
+            self._persist("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+            rows = self._db.execute("SELECT key, expires_at, value FROM responses ORDER BY rowid").fetchall()
+            for key, expires_at, value in rows:
+                self._insert(key, expires_at, json.loads(value), value)
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.stats["misses"] += 1
+                return None
+            expires_at, _, value = item
+            if expires_at < time.time():
+                self._remove(key)
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def put(self, key, value):
+        encoded = json.dumps(value, ensure_ascii=False)
+        expires_at = time.time() + self.ttl_s
+        with self._lock:
+            if not self._insert(key, expires_at, value, encoded):
+                return
+            self.stats["stores"] += 1
+            self._persist("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, expires_at, encoded))
+
+    def _insert(self, key, expires_at, value, encoded):
+        nbytes = len(encoded.encode("utf-8"))
+        if nbytes > self.max_bytes:
+            return False
+        if key in self._entries:
+            self._remove(key, persist=False)
+        self._entries[key] = (expires_at, nbytes, value)
+        self.total_bytes += nbytes
+        while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+        return True
+
+    def _remove(self, key, persist=True):
+        _, nbytes, _ = self._entries.pop(key)
+        self.total_bytes -= nbytes
+        if persist:
+            self._persist("DELETE FROM responses WHERE key = ?", (key,))
+
+    def _persist(self, sql, params):
+        if self._db is None:
+            return
+        try:
+            self._db.execute(sql, params)
+            self._db.commit()
+        except sqlite3.Error as e:
+            # e.g. "database is locked" when another worker held the write lock past the timeout
+            self.stats["db_errors"] += 1
+            print(f"[response-cache] sqlite write failed: {e}", flush=True)
+            try:
+                self._db.rollback()
+            except sqlite3.Error:
+                pass
+
+    def summary(self):
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return dict(self.stats, entries=len(self._entries), bytes=self.total_bytes,
+                        hit_rate=round(self.stats["hits"] / lookups, 3) if lookups else None)
+
+    def __len__(self):
+        return len(self._entries)
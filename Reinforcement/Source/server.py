@@ -1,75 +1,575 @@
 # filename: server.py
-# Description: A simple Flask server to load a local Hugging Face model 
+# Description: A simple Flask server to load a local Hugging Face model
 #              and provide a chat API endpoint.
 
-from flask import Flask, request, jsonify
+import json
+import os
+import threading
+import time
+
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from transformers import pipeline
 import torch
 
+from chat_metrics import FirstTokenTimer, LATENCY_BUCKETS, RATE_BUCKETS, Registry, TOKEN_BUCKETS
+from chat_scheduler import BatchScheduler
+from chat_stream import BatchTokenStreamer, TokenStream
+from context_budget import ContextBudget
+from model_loader import (LoadProgress, format_cores, load_model, load_tokenizer, parse_cores, pin_process,
+                          precision_from_env, resident_memory_mb)
+from prefix_cache import PrefixCache, slice_batch_cache
+from response_cache import ResponseCache, cache_key
+
 # --- Configuration ---
 # 1. Flask App Setup
 app = Flask(__name__)
 # Allow Cross-Origin Resource Sharing for requests from the web browser
-CORS(app) 
+CORS(app)
 
 # 2. Model Loading
 # --- IMPORTANT ---
 # Change this path to the directory of your local model.
 # This can be a model you downloaded or your own fine-tuned model.
-MODEL_PATH = "./google/gemma-3-1b-it" 
-
-print(f"Loading AI model from: {MODEL_PATH}...")
-# Initialize the text generation pipeline
-try:
-    pipe = pipeline(
-        "text-generation",
-        model=MODEL_PATH,
-        dtype=torch.float32,
-        device_map="auto" # Automatically use GPU if available
-    )
-    print("AI model loaded successfully!")
-except Exception as e:
-    print(f"Error loading model: {e}")
-    pipe = None
+MODEL_PATH = os.environ.get("CHAT_MODEL_PATH", "./google/gemma-3-1b-it")
 
-# 3. API Endpoint for Chat
-@app.route('/chat', methods=['POST'])
-def chat():
-    """Handles chat requests from the frontend."""
-    if not pipe:
-        return jsonify({"error": "Model is not available."}), 500
+# 3. Generation / batching settings (override with environment variables)
+MAX_NEW_TOKENS = int(os.environ.get("CHAT_MAX_NEW_TOKENS", 256))
+MAX_BATCH_SIZE = int(os.environ.get("CHAT_MAX_BATCH_SIZE", 8))
+MAX_BATCH_WAIT_MS = float(os.environ.get("CHAT_MAX_BATCH_WAIT_MS", 20))
+BATCH_LENGTH_TOLERANCE = int(os.environ.get("CHAT_BATCH_LENGTH_TOLERANCE", 128))
+# Memory budget for cached conversation prefixes (past key/values); 0 disables reuse
+PREFIX_CACHE_MB = float(os.environ.get("CHAT_PREFIX_CACHE_MB", 512))
+PREFIX_MIN_TOKENS = int(os.environ.get("CHAT_PREFIX_MIN_TOKENS", 16))
+# A request reusing a cached prefix runs alone (generate() takes one past_key_values). That only
+# pays off when nothing else is queued to batch with, or when the reused prefix is at least this
+# long; otherwise it is batched and prefilled in full. 0 = always run such requests alone.
+PREFIX_EXCLUSIVE_MIN_TOKENS = int(os.environ.get("CHAT_PREFIX_EXCLUSIVE_MIN_TOKENS", 512))
+# Response cache: off | deterministic (cache greedy requests only) | all (also reuse sampled replies)
+RESPONSE_CACHE_MODE = os.environ.get("CHAT_RESPONSE_CACHE", "deterministic").lower()
+RESPONSE_CACHE_ENTRIES = int(os.environ.get("CHAT_RESPONSE_CACHE_ENTRIES", 1024))
+RESPONSE_CACHE_MB = float(os.environ.get("CHAT_RESPONSE_CACHE_MB", 16))
+RESPONSE_CACHE_TTL_S = float(os.environ.get("CHAT_RESPONSE_CACHE_TTL_S", 3600))
+RESPONSE_CACHE_PATH = os.environ.get("CHAT_RESPONSE_CACHE_PATH")  # sqlite file; unset = memory only
+# Prompt-token budget: older turns are dropped (system prompt kept) beyond this; 0 disables
+MAX_PROMPT_TOKENS = int(os.environ.get("CHAT_MAX_PROMPT_TOKENS", 2048))
+CONTEXT_TRIM_TO = float(os.environ.get("CHAT_CONTEXT_TRIM_TO", 0.75))  # fraction of the budget kept after a trim
+# Greedy decoding unless a request sends "deterministic": false (makes replies cacheable)
+DETERMINISTIC_DEFAULT = os.environ.get("CHAT_DETERMINISTIC", "0").lower() in ("1", "true", "yes")
+
+# Worker settings (set by chat_router.py when running several replicas)
+PORT = int(os.environ.get("CHAT_PORT", 5000))
+CPU_CORES = parse_cores(os.environ.get("CHAT_CPU_CORES", ""))
+TORCH_THREADS = int(os.environ.get("CHAT_TORCH_THREADS", 0)) or None
+if CPU_CORES or TORCH_THREADS:
+    CPU_CORES, TORCH_THREADS = pin_process(CPU_CORES, TORCH_THREADS)
+    print(f"Pinned to cores {format_cores(CPU_CORES)} with {TORCH_THREADS} torch threads")
+
+# Precision / backend: CHAT_PRECISION=float32|bfloat16|int8, CHAT_TORCH_COMPILE=1 to torch.compile
+# (compare the modes on your machine with precision_bench.py)
+PRECISION, TORCH_COMPILE = precision_from_env()
+
+LOAD_RETRIES = int(os.environ.get("CHAT_LOAD_RETRIES", 2))
+LOAD_RETRY_DELAY_S = float(os.environ.get("CHAT_LOAD_RETRY_DELAY_S", 10))
+
+# The model is loaded in a background thread (see _load_in_background below) so that the
+# server is reachable immediately; /health and /ready report the load progress.
+tokenizer = model = scheduler = context_budget = None
+load_progress = LoadProgress()
+
+
+def _eos_token_ids():
+    eos = model.generation_config.eos_token_id
+    if eos is None:
+        eos = tokenizer.eos_token_id
+    return eos if isinstance(eos, list) else [eos]
+
+
+# --- Metrics (served at /metrics in Prometheus text format) ---
+metrics = Registry()
+m_requests = metrics.counter("chat_requests_total", "Chat requests by endpoint and outcome.",
+                             ("endpoint", "outcome"))
+m_truncated = metrics.counter("chat_truncated_total", "Replies cut off by max_new_tokens.", ("endpoint",))
+m_queue_wait = metrics.histogram("chat_queue_wait_seconds", "Time from submit to the start of generation.")
+m_prompt_tokens = metrics.histogram("chat_prompt_tokens", "Prompt length in tokens.", TOKEN_BUCKETS)
+m_completion_tokens = metrics.histogram("chat_completion_tokens", "Generated tokens per reply.", TOKEN_BUCKETS)
+m_prefill = metrics.histogram("chat_prefill_seconds", "Prompt processing time up to the first new token.")
+m_decode_rate = metrics.histogram("chat_decode_tokens_per_second", "Decode speed after the first token.",
+                                  RATE_BUCKETS)
+m_context_trimmed = metrics.counter("chat_context_trimmed_total", "Requests whose history was trimmed.")
+m_context_saved = metrics.counter("chat_context_tokens_saved_total", "Prompt tokens dropped by context trimming.")
+m_prefix_batched = metrics.counter("chat_prefix_batched_total",
+                                   "Requests with a cached prefix that were batched instead of reusing it.")
+m_batch_size = metrics.histogram("chat_batch_size", "Requests per generate() call.", (1, 2, 4, 8, 16, 32))
+m_latency = metrics.histogram("chat_request_seconds", "Total request latency.", LATENCY_BUCKETS, ("endpoint",))
+metrics.gauge("chat_queue_depth", "Requests waiting for a batch.",
+              lambda: scheduler.queue_depth() if scheduler is not None else 0)
+metrics.gauge("chat_model_ready", "1 once the model has loaded.", lambda: int(load_progress.is_ready))
+
+
+def _add_timings(results, batch, timer):
+    """Attach queue / prefill / decode timings to each request's result."""
+    prefill_s, decode_s = timer.timings()
+    for req, result in zip(batch, results):
+        result.update(
+            queue_wait_s=req.started_at - req.enqueued_at,
+            prefill_s=prefill_s,
+            decode_s=decode_s,
+            batch_size=len(batch),
+        )
+    return results
+
+
+def _finish_row(row):
+    # Drop padding that follows an early end-of-sequence
+    while row and row[-1] == tokenizer.pad_token_id:
+        row.pop()
+    return {
+        "text": tokenizer.decode(row, skip_special_tokens=True).strip(),
+        "completion_tokens": len(row),
+    }
+
+
+def generate_with_prefix(req):
+    """
+    Generate for one conversation turn, reusing the cached past key/values materialised by
+    _submit for the common prefix and caching this turn's key/values (prompt + reply) for the
+    next turn.
+    """
+    past, prefix_len = req.meta.get("past"), req.meta.get("reused_tokens", 0)
+
+    input_ids = torch.tensor([req.input_ids], device=model.device)
+    streamer = None
+    if req.on_text is not None:
+        streamer = BatchTokenStreamer(tokenizer, [req.on_text], {tokenizer.pad_token_id, *_eos_token_ids()})
+    streamer = FirstTokenTimer(streamer)
+
+    with torch.inference_mode():
+        output = model.generate(
+            input_ids=input_ids,
+            attention_mask=torch.ones_like(input_ids),
+            past_key_values=past,
+            pad_token_id=tokenizer.pad_token_id,
+            streamer=streamer,
+            return_dict_in_generate=True,
+            **req.gen_kwargs
+        )
+
+    sequence = output.sequences[0].tolist()
+    cache = output.past_key_values
+    if cache is not None and hasattr(cache, "get_seq_length"):
+        prefix_cache.store(req.meta["cache_key"], sequence[:cache.get_seq_length()], cache)
+
+    result = _finish_row(sequence[len(req.input_ids):])
+    result["reused_tokens"] = prefix_len
+    return _add_timings([result], [req], streamer)[0]
+
+
+def _store_batch_prefixes(batch, output, padded_len, results):
+    """Cache each session row's key/values from a batched generate() for its next turn."""
+    cache = output.past_key_values
+    if cache is None or not hasattr(cache, "get_seq_length"):
+        return
+    cache_len = cache.get_seq_length()
+    for row, (req, result) in enumerate(zip(batch, results)):
+        if "cache_key" not in req.meta:
+            continue
+        pad = padded_len - len(req.input_ids)
+        generated = output.sequences[row, padded_len:padded_len + result["completion_tokens"]].tolist()
+        # The last generated token has not been fed through the model, so it is not in the cache
+        length = min(len(req.input_ids) + len(generated), cache_len - pad)
+        row_cache = slice_batch_cache(cache, row, pad, length)
+        if row_cache is not None:
+            prefix_cache.store(req.meta["cache_key"], (req.input_ids + generated)[:length], row_cache)
+
+
+def generate_batch(batch):
+    """Run one batched generate() call for requests that share generation parameters."""
+    if len(batch) == 1 and batch[0].exclusive:
+        return [generate_with_prefix(batch[0])]
+
+    padded = tokenizer.pad({"input_ids": [r.input_ids for r in batch]}, return_tensors="pt")
+    input_ids = padded["input_ids"].to(model.device)
+    attention_mask = padded["attention_mask"].to(model.device)
+
+    # Stream tokens only if some request in the batch asked for it
+    streamer = None
+    if any(r.on_text is not None for r in batch):
+        stop_ids = {tokenizer.pad_token_id, *_eos_token_ids()}
+        streamer = BatchTokenStreamer(tokenizer, [r.on_text for r in batch], stop_ids)
+    streamer = FirstTokenTimer(streamer)
+    # Keep the batch's key/values only if a session row wants them for its next turn
+    keep_cache = any("cache_key" in r.meta for r in batch)
+
+    with torch.inference_mode():
+        output = model.generate(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            pad_token_id=tokenizer.pad_token_id,
+            streamer=streamer,
+            return_dict_in_generate=keep_cache,
+            **batch[0].gen_kwargs
+        )
+
+    sequences = output.sequences if keep_cache else output
+    results = [_finish_row(row) for row in sequences[:, input_ids.shape[1]:].tolist()]
+    if keep_cache:
+        _store_batch_prefixes(batch, output, input_ids.shape[1], results)
+    return _add_timings(results, batch, streamer)
+
+
+prefix_cache = PrefixCache(int(PREFIX_CACHE_MB * 1024 * 1024), PREFIX_MIN_TOKENS) if PREFIX_CACHE_MB > 0 else None
+
+response_cache = ResponseCache(
+    max_entries=RESPONSE_CACHE_ENTRIES,
+    max_bytes=int(RESPONSE_CACHE_MB * 1024 * 1024),
+    ttl_s=RESPONSE_CACHE_TTL_S,
+    path=RESPONSE_CACHE_PATH,
+) if RESPONSE_CACHE_MODE in ("deterministic", "all") else None
+
+
+def _warmup(tok, mdl):
+    """Generate one token so that the first real request does not pay for lazy initialisation."""
+    ids = tok.apply_chat_template([{"role": "user", "content": "Hi"}], tokenize=True, add_generation_prompt=True)
+    input_ids = torch.tensor([ids], device=mdl.device)
+    with torch.inference_mode():
+        mdl.generate(input_ids, attention_mask=torch.ones_like(input_ids), max_new_tokens=1,
+                     do_sample=False, pad_token_id=tok.pad_token_id)
+
+
+def _load_in_background():
+    """
+    Load tokenizer, weights and warm up; retry a few times, then give up. The process stays
+    up with load status "failed" (/health and /ready answer 503) so that a supervisor
+    (chat_router.py, a container health check, ...) can see the error and restart it.
+    """
+    global tokenizer, model, scheduler, context_budget
+    print(f"Loading AI model from: {MODEL_PATH} ({PRECISION}{', compiled' if TORCH_COMPILE else ''})...")
+    for attempt in range(LOAD_RETRIES + 1):
+        if attempt:
+            load_progress.retry()
+        try:
+            # Load the tokenizer and model directly so that requests can be batched into one generate() call
+            with load_progress.step("tokenizer"):
+                tok = load_tokenizer(MODEL_PATH)
+            with load_progress.step("weights"):
+                mdl, load_info = load_model(MODEL_PATH, PRECISION, TORCH_COMPILE)
+            with load_progress.step("warmup"):
+                _warmup(tok, mdl)
+        except Exception as e:
+            final = attempt == LOAD_RETRIES
+            load_progress.fail(e, final)
+            print(f"Error loading model (attempt {attempt + 1}/{LOAD_RETRIES + 1}): {e}")
+            if final:
+                print("Giving up on loading the model; /health and /ready now report it as failed.", flush=True)
+                return
+            time.sleep(LOAD_RETRY_DELAY_S)
+            continue
+
+        tokenizer, model = tok, mdl
+        if MAX_PROMPT_TOKENS > 0:
+            context_budget = ContextBudget(tokenizer, MAX_PROMPT_TOKENS, CONTEXT_TRIM_TO)
+        scheduler = BatchScheduler(
+            generate_batch,
+            max_batch_size=MAX_BATCH_SIZE,
+            max_wait_ms=MAX_BATCH_WAIT_MS,
+            length_tolerance=BATCH_LENGTH_TOLERANCE,
+        )
+        load_progress.ready(rss_mb=round(resident_memory_mb()), **load_info)
+        print(f"AI model loaded successfully! {load_progress.snapshot()}")
+        return
 
-    # Get message history from the request
-    data = request.json
-    messages = data.get('messages', [])
-    
-    if not messages:
-        return jsonify({"error": "No messages provided"}), 400
-
-    # Format the prompt using the model's chat template
-    prompt = pipe.tokenizer.apply_chat_template(
-        messages, 
-        tokenize=False, 
-        add_generation_prompt=True
-    )
 
-    # Generate a response using the pipeline
-    outputs = pipe(
-        prompt,
-        max_new_tokens=256,
+threading.Thread(target=_load_in_background, name="model-loader", daemon=True).start()
+
+
+def _max_new_tokens(data):
+    """max_new_tokens from a request body, clamped to [1, MAX_NEW_TOKENS]. ValueError if not an integer."""
+    value = data.get('max_new_tokens', MAX_NEW_TOKENS)
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"max_new_tokens must be an integer, got {value!r}")
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f"max_new_tokens must be an integer, got {value!r}") from None
+    return min(max(value, 1), MAX_NEW_TOKENS)
+
+
+def _gen_kwargs(data):
+    """Generation parameters for a validated chat request body (see _validate)."""
+    max_new_tokens = data['max_new_tokens']
+    if data.get('deterministic', DETERMINISTIC_DEFAULT):
+        return dict(max_new_tokens=max_new_tokens, do_sample=False)
+    return dict(
+        max_new_tokens=max_new_tokens,
         do_sample=True,
         temperature=0.7,
         top_k=50,
         top_p=0.95
     )
-    
-    # Extract only the newly generated text
-    response_text = outputs[0]["generated_text"][len(prompt):]
-    
-    return jsonify({"response": response_text.strip()})
 
-# 4. Run the server
+
+def _tokenize(data):
+    # Format the prompt using the model's chat template (tokenized here, in the request thread)
+    return tokenizer.apply_chat_template(
+        data['messages'],
+        tokenize=True,
+        add_generation_prompt=True
+    )
+
+
+def _fit_context(data):
+    """Trim the message history to the prompt-token budget. Returns (request body, report or None)."""
+    if context_budget is None:
+        return data, None
+    messages, report = context_budget.fit(data['messages'], data.get('session_id'))
+    if report["dropped_messages"]:
+        m_context_trimmed.inc()
+        m_context_saved.inc(amount=report["tokens_saved"])
+        data = dict(data, messages=messages)
+    return data, report
+
+
+def _response_key(data, gen_kwargs):
+    """Response cache key for a request, or None if its reply must not be cached."""
+    if response_cache is None:
+        return None
+    if RESPONSE_CACHE_MODE == "deterministic" and gen_kwargs["do_sample"]:
+        return None
+    return cache_key(data['messages'], gen_kwargs)
+
+
+def _cache_result(key, input_ids, result):
+    if key is None:
+        return
+    try:
+        response_cache.put(key, {
+            "text": result["text"],
+            "prompt_tokens": len(input_ids),
+            "completion_tokens": result["completion_tokens"],
+        })
+    except Exception as e:
+        # The reply has already been generated; a cache failure must not turn it into an error
+        print(f"[response-cache] failed to store a reply: {e}", flush=True)
+
+
+def _cached_usage(hit):
+    return {
+        "prompt_tokens": hit["prompt_tokens"],
+        "completion_tokens": hit["completion_tokens"],
+        "cached_prompt_tokens": hit["prompt_tokens"],
+        "cached_response": True,
+    }
+
+
+def _submit(data, input_ids, gen_kwargs, on_text=None):
+    """
+    Queue a request. A request with a cached prefix runs on its own (generate() takes a single
+    past_key_values) only if the queue is otherwise empty or the prefix is at least
+    PREFIX_EXCLUSIVE_MIN_TOKENS long, and only once the cached entry has been cropped to the
+    prefix; everything else is batched. The key/values of session requests (`session_id` in
+    the body) are cached for the next turn either way.
+    """
+    session_id = data.get('session_id')
+    if prefix_cache is None:
+        return scheduler.submit(input_ids, gen_kwargs, on_text)
+    cache_key = PrefixCache.key_for(input_ids, session_id)
+    entry, prefix_len = prefix_cache.lookup(input_ids, session_id)
+    if entry is not None:
+        if scheduler.queue_depth() == 0 or prefix_len >= PREFIX_EXCLUSIVE_MIN_TOKENS:
+            past = prefix_cache.materialize(entry, prefix_len)
+            if past is not None:
+                meta = {"past": past, "reused_tokens": prefix_len, "cache_key": cache_key}
+                return scheduler.submit(input_ids, gen_kwargs, on_text, exclusive=True, meta=meta)
+        m_prefix_batched.inc()
+    meta = {"cache_key": cache_key} if session_id else None
+    return scheduler.submit(input_ids, gen_kwargs, on_text, meta=meta)
+
+
+def _usage(input_ids, result, context=None):
+    usage = {
+        "prompt_tokens": len(input_ids),
+        "completion_tokens": result["completion_tokens"],
+        "cached_prompt_tokens": result.get("reused_tokens", 0),
+    }
+    if context is not None:
+        usage["context"] = context
+    return usage
+
+
+def _record(endpoint, started, gen_kwargs, input_ids=None, result=None, outcome="generated", error=None,
+            **fields):
+    """Update metrics and write one structured timing log line for a finished request."""
+    latency = time.perf_counter() - started
+    m_requests.inc(endpoint, outcome)
+    m_latency.observe(latency, endpoint)
+    entry = {"endpoint": endpoint, "outcome": outcome, "latency_s": round(latency, 4)}
+
+    if result is not None and outcome == "generated":
+        completion = result["completion_tokens"]
+        truncated = completion >= gen_kwargs["max_new_tokens"]
+        m_prompt_tokens.observe(len(input_ids))
+        m_completion_tokens.observe(completion)
+        m_queue_wait.observe(result["queue_wait_s"])
+        m_batch_size.observe(result["batch_size"])
+        if result["prefill_s"] is not None:
+            m_prefill.observe(result["prefill_s"])
+        decode_rate = None
+        if result["decode_s"] and completion > 1:
+            decode_rate = (completion - 1) / result["decode_s"]
+            m_decode_rate.observe(decode_rate)
+        if truncated:
+            m_truncated.inc(endpoint)
+        entry.update(
+            prompt_tokens=len(input_ids),
+            cached_prompt_tokens=result.get("reused_tokens", 0),
+            completion_tokens=completion,
+            batch_size=result["batch_size"],
+            queue_wait_s=round(result["queue_wait_s"], 4),
+            prefill_s=None if result["prefill_s"] is None else round(result["prefill_s"], 4),
+            decode_tok_s=None if decode_rate is None else round(decode_rate, 1),
+            truncated=truncated,
+        )
+    if error is not None:
+        entry["error"] = str(error)
+    entry.update(fields)
+    print("[request] " + json.dumps(entry), flush=True)
+
+
+def _validate():
+    """Returns (request body, None) or (None, error response)."""
+    if scheduler is None:
+        if load_progress.status == "failed":
+            return None, (jsonify({"error": "Model is not available.", "load": load_progress.snapshot()}), 500)
+        return None, (jsonify({"error": "Model is still loading.", "load": load_progress.snapshot()}), 503)
+    # Get message history from the request
+    data = request.json or {}
+    if not data.get('messages'):
+        return None, (jsonify({"error": "No messages provided"}), 400)
+    try:
+        data = dict(data, max_new_tokens=_max_new_tokens(data))
+    except ValueError as e:
+        return None, (jsonify({"error": str(e)}), 400)
+    return data, None
+
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+# 4. API Endpoints for Chat
+@app.route('/chat', methods=['POST'])
+def chat():
+    """Handles chat requests from the frontend."""
+    started = time.perf_counter()
+    data, error = _validate()
+    if error:
+        m_requests.inc("chat", "rejected")
+        return error
+    data, context = _fit_context(data)
+    gen_kwargs = _gen_kwargs(data)
+    key = _response_key(data, gen_kwargs)
+    hit = response_cache.get(key) if key else None
+    if hit is not None:
+        _record("chat", started, gen_kwargs, outcome="cached")
+        return jsonify({"response": hit["text"], "usage": _cached_usage(hit)})
+
+    input_ids = _tokenize(data)
+    # Queue the request; it is generated together with other concurrent requests
+    try:
+        result = _submit(data, input_ids, gen_kwargs).result()
+    except Exception as e:
+        _record("chat", started, gen_kwargs, input_ids, outcome="error", error=e)
+        return jsonify({"error": str(e)}), 500
+    _cache_result(key, input_ids, result)
+    _record("chat", started, gen_kwargs, input_ids, result,
+            tokens_saved=context["tokens_saved"] if context else 0)
+
+    return jsonify({
+        "response": result["text"],
+        "usage": _usage(input_ids, result, context),
+    })
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Same request body as /chat, but the reply is streamed as Server-Sent Events:
+    `token` events carry text chunks as they are generated, then one `done` event
+    with usage and time-to-first-token (or an `error` event).
+    """
+    started = time.perf_counter()
+    data, error = _validate()
+    if error:
+        m_requests.inc("stream", "rejected")
+        return error
+    data, context = _fit_context(data)
+    gen_kwargs = _gen_kwargs(data)
+    key = _response_key(data, gen_kwargs)
+    hit = response_cache.get(key) if key else None
+    if hit is not None:
+        _record("stream", started, gen_kwargs, outcome="cached")
+        events = [_sse("token", {"text": hit["text"]}),
+                  _sse("done", {"response": hit["text"], "usage": _cached_usage(hit), "ttft_ms": 0.0})]
+        return Response(events, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+    stream = TokenStream()
+    input_ids = _tokenize(data)
+    future = _submit(data, input_ids, gen_kwargs, on_text=stream.put)
+    future.add_done_callback(lambda _: stream.close())
+
+    def events():
+        for text in stream:
+            yield _sse("token", {"text": text})
+        try:
+            result = future.result()
+        except Exception as e:
+            _record("stream", started, gen_kwargs, input_ids, outcome="error", error=e)
+            yield _sse("error", {"error": str(e)})
+            return
+        ttft_ms = None if stream.ttft is None else round(stream.ttft * 1000, 1)
+        _cache_result(key, input_ids, result)
+        _record("stream", started, gen_kwargs, input_ids, result, ttft_ms=ttft_ms,
+                tokens_saved=context["tokens_saved"] if context else 0)
+        usage = _usage(input_ids, result, context)
+        yield _sse("done", {
+            "response": result["text"],
+            "usage": usage,
+            "ttft_ms": ttft_ms,
+        })
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/health', methods=['GET'])
+def health():
+    """Liveness: the process is up (the model may still be loading); 503 once loading has failed for good."""
+    snapshot = load_progress.snapshot()
+    if snapshot["status"] == "failed":
+        return jsonify({"status": "failed", "model": snapshot}), 503
+    return jsonify({"status": "ok", "model": snapshot})
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness: 200 once the model can serve requests, else 503 with load progress (status loading/failed)."""
+    snapshot = load_progress.snapshot()
+    return jsonify(snapshot), (200 if load_progress.is_ready else 503)
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters for the response and prefix caches and the context budget."""
+    return jsonify({
+        "response_cache": response_cache.summary() if response_cache is not None else None,
+        "prefix_cache": dict(prefix_cache.stats, entries=len(prefix_cache), bytes=prefix_cache.total_bytes)
+        if prefix_cache is not None else None,
+        "context_budget": context_budget.summary() if context_budget is not None else None,
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text exposition of the serving metrics."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# 5. Run the server
 if __name__ == '__main__':
-    # Runs the Flask app on localhost, accessible on port 5000
-    app.run(host='0.0.0.0', port=5000)
+    # Runs the Flask app on localhost, accessible on port 5000 (CHAT_PORT)
+    # (threaded so that concurrent requests can be batched together)
+    app.run(host='0.0.0.0', port=PORT, threaded=True)
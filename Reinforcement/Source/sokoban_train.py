@@ -5,12 +5,18 @@ from gymnasium import spaces
 
 from stable_baselines3 import PPO
 from stable_baselines3.common.monitor import Monitor
-from stable_baselines3.common.vec_env import DummyVecEnv
+from stable_baselines3.common.vec_env import DummyVecEnv, VecMonitor
 from stable_baselines3.common.torch_layers import BaseFeaturesExtractor
 from stable_baselines3.common.callbacks import CheckpointCallback
 
-from rnd_wrapper import RNDRewardWrapper 
+from rnd_wrapper import RNDRewardWrapper, VecRNDRewardWrapper
 from sokoban_env import SokobanEnv
+from sokoban_vec_env import SokobanVecEnv
+
+# True면 N_ENVS개의 보드를 한 번에 진행하는 SokobanVecEnv + 배치 RND(VecRNDRewardWrapper) 사용
+# False면 기존처럼 SokobanEnv 1개를 RNDRewardWrapper로 감싸 DummyVecEnv에 넣음
+USE_BATCHED_ENV = True
+N_ENVS = 16
 
 class CustomCNN(BaseFeaturesExtractor):
     def __init__(self, observation_space: spaces.Box, features_dim: int = 128):
@@ -51,7 +57,11 @@ if __name__ == '__main__':
     os.makedirs(tensorboard_log_dir, exist_ok=True)
     os.makedirs(model_save_path, exist_ok=True)
 
-    env = DummyVecEnv([make_env(log_dir)])
+    if USE_BATCHED_ENV:
+        env = VecRNDRewardWrapper(SokobanVecEnv(N_ENVS), lr=1e-4, feature_dim=128, intrinsic_reward_coef=0.001)
+        env = VecMonitor(env, log_dir)
+    else:
+        env = DummyVecEnv([make_env(log_dir)])
 
     policy_kwargs = dict(
         features_extractor_class=CustomCNN,
@@ -76,7 +86,7 @@ if __name__ == '__main__':
             verbose=1,
             tensorboard_log=tensorboard_log_dir,
             learning_rate=3e-4,
-            n_steps=2048,
+            n_steps=2048 // env.num_envs, # 롤아웃 한 번의 전체 스텝 수를 2048로 유지
             batch_size=128,
             n_epochs=10,
             gamma=0.99,
@@ -84,7 +94,7 @@ if __name__ == '__main__':
         )
     
     checkpoint_callback = CheckpointCallback(
-        save_freq=50000,
+        save_freq=max(1, 50000 // env.num_envs), # save_freq는 VecEnv step 단위이므로 환경 수로 나눠 5만 타임스텝마다 저장
         save_path=model_save_path,
         name_prefix="sokoban_rnd_manual_model"
     )
@@ -0,0 +1,383 @@
+"""
+소코반 강화학습 스택 처리량(초당 스텝 수) 벤치마크
+
+SokobanGame / SokobanEnv / RND 래퍼 / VecEnv / PPO 롤아웃 수집의 초당 처리량을 재서
+JSON으로 저장하고, 이전 결과와 비교해 기준 이상 느려진 항목이 있으면 종료 코드 1을 돌려준다.
+
+사용 예:
+    python benchmark.py --output bench_base.json                # 기준 측정
+    python benchmark.py --compare bench_base.json --threshold 0.1  # 10% 넘게 느려지면 실패
+    python benchmark.py --filter game_ --quick                  # 일부 항목만 빠르게
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from sokoban_game import SokobanGame
+from sokoban_env import SokobanEnv
+from sokoban_levels import LevelBank, generate_reverse_play_level, write_level_bank
+from sokoban_vec_env import SokobanVecEnv
+from rnd_wrapper import RNDRewardWrapper, VecRNDRewardWrapper
+
+BENCHMARKS = {}
+
+
+def benchmark(name, unit="steps"):
+    """
+    벤치마크 등록 데코레이터.
+    함수는 n을 받아 준비(환경/모델 생성 등)를 마친 뒤, 측정 구간을 실행하고
+    처리한 단위 수를 돌려주는 run() 함수를 반환한다. 준비 시간은 측정에 포함되지 않는다.
+    """
+    def register(fn):
+        BENCHMARKS[name] = (fn, unit)
+        return fn
+    return register
+
+
+def _random_actions(n):
+    return np.random.randint(0, 4, size=n).tolist()
+
+
+def _game_step(engine, n):
+    game = SokobanGame(engine=engine)
+    actions = _random_actions(n)
+
+    def run():
+        for action in actions:
+            _, _, done = game.step(action)
+            if done:
+                game.reset()
+        return n
+    return run
+
+
+def _get_observation(engine, n):
+    game = SokobanGame(engine=engine)
+
+    def run():
+        for _ in range(n):
+            game.get_observation()
+        return n
+    return run
+
+
+def _game_reset(game, n):
+    def run():
+        for _ in range(n):
+            game.reset()
+        return n
+    return run
+
+
+@benchmark("game_step[set]")
+def bench_game_step_set(n):
+    return _game_step("set", n)
+
+
+@benchmark("game_step[array]")
+def bench_game_step_array(n):
+    return _game_step("array", n)
+
+
+@benchmark("get_observation[set]", unit="calls")
+def bench_get_observation_set(n):
+    return _get_observation("set", n)
+
+
+@benchmark("get_observation[array]", unit="calls")
+def bench_get_observation_array(n):
+    return _get_observation("array", n)
+
+
+@benchmark("game_reset[random]", unit="resets")
+def bench_game_reset_random(n):
+    return _game_reset(SokobanGame(), n // 10)
+
+
+_BANK = None
+
+
+def _level_bank():
+    """벤치마크용 작은 레벨 뱅크 (임시 파일, 프로세스당 한 번 생성)"""
+    global _BANK
+    if _BANK is None:
+        rng = random.Random(0)
+        path = os.path.join(tempfile.gettempdir(), "sokoban_benchmark_levels.bin")
+        write_level_bank(path, (generate_reverse_play_level(rng=rng) for _ in range(2000)))
+        _BANK = LevelBank(path)
+    return _BANK
+
+
+@benchmark("game_reset[bank]", unit="resets")
+def bench_game_reset_bank(n):
+    return _game_reset(SokobanGame(level_bank=_level_bank()), n // 10)
+
+
+@benchmark("level_generate[reverse_play]", unit="levels")
+def bench_level_generate(n):
+    rng = random.Random(0)
+
+    def run():
+        for _ in range(n // 100):
+            generate_reverse_play_level(rng=rng)
+        return n // 100
+    return run
+
+
+def _env_steps(env, n):
+    env.reset()
+    actions = _random_actions(n)
+
+    def run():
+        for action in actions:
+            _, _, terminated, truncated, _ = env.step(action)
+            if terminated or truncated:
+                env.reset()
+        return n
+    return run
+
+
+@benchmark("env_step")
+def bench_env_step(n):
+    return _env_steps(SokobanEnv(), n)
+
+
+@benchmark("env_step[rnd]")
+def bench_env_step_rnd(n):
+    return _env_steps(RNDRewardWrapper(SokobanEnv()), n // 20)
+
+
+@benchmark("env_step[rnd,cache]")
+def bench_env_step_rnd_cache(n):
+    # 타깃 캐시는 선택 사항이므로 켠 경우를 따로 측정 (워밍업 뒤 obs_rms 고정)
+    return _env_steps(RNDRewardWrapper(SokobanEnv(), target_cache_size=4096, target_cache_warmup=0), n // 20)
+
+
+@benchmark("env_step[rgb_array]", unit="frames")
+def bench_env_step_rgb_array(n):
+    # 프레임을 바로 버리므로 복사 없는 뷰 반환(render_copy=False)으로 측정
+    env = SokobanEnv(render_mode="rgb_array", render_size=(160, 120), render_copy=False)
+    env.reset()
+    env.render()
+    actions = _random_actions(n // 5)
+
+    def run():
+        for action in actions:
+            _, _, terminated, truncated, _ = env.step(action)
+            if terminated or truncated:
+                env.reset()
+            env.render()
+        return len(actions)
+    return run
+
+
+def check_incremental_render(sizes=((160, 120), (320, 240), (800, 600)), steps=500):
+    """
+    render_incremental() 결과가 매 스텝 전체 render()와 픽셀 단위로 같은지 확인.
+    다른 크기 목록 [(크기, 스텝, 다른 픽셀 수)]를 반환 (같으면 빈 리스트)
+    """
+    import pygame
+    mismatches = []
+    for size in sizes:
+        env = SokobanEnv(render_mode="rgb_array", render_size=size)
+        env.reset()
+        env.render()
+        full = np.zeros_like(env._frame)
+        full_surface = pygame.image.frombuffer(full, size, "RGB")
+        for step in range(steps):
+            _, _, terminated, truncated, _ = env.step(np.random.randint(4))
+            if terminated or truncated:
+                env.reset()
+            frame = env.render()
+            state = env.game._render_state
+            env.game.render(full_surface, env._tile_size)
+            env.game._render_state = state
+            diff = int((frame != full).any(axis=-1).sum())
+            if diff:
+                mismatches.append((size, step, diff))
+                break
+        env.close()
+    return mismatches
+
+
+def _vec_steps(venv, n):
+    steps = max(1, n // venv.num_envs)
+    venv.reset()
+    actions = np.random.randint(0, 4, size=(steps, venv.num_envs))
+
+    def run():
+        for a in actions:
+            venv.step(a)
+        return steps * venv.num_envs
+    return run
+
+
+@benchmark("vec_env_step[N=64]")
+def bench_vec_env_step(n):
+    return _vec_steps(SokobanVecEnv(64), n * 4)
+
+
+@benchmark("vec_env_step[N=64,rnd]")
+def bench_vec_env_step_rnd(n):
+    return _vec_steps(VecRNDRewardWrapper(SokobanVecEnv(64)), n)
+
+
+@benchmark("ppo_rollout[N=16]")
+def bench_ppo_rollout(n):
+    from stable_baselines3 import PPO
+
+    n_envs, n_steps = 16, 128
+    model = PPO("MlpPolicy", SokobanVecEnv(n_envs), n_steps=n_steps, device="cpu", verbose=0)
+    rollouts = max(1, n // (n_envs * n_steps * 4))
+    _, callback = model._setup_learn(rollouts * n_envs * n_steps, None)
+
+    def run():
+        for _ in range(rollouts):
+            model.collect_rollouts(model.env, callback, model.rollout_buffer, n_rollout_steps=n_steps)
+        return rollouts * n_envs * n_steps
+    return run
+
+
+# ---- 실행 / 비교 ----
+def run_benchmark(fn, n, repeat, min_time=0.0, max_repeat=50):
+    """
+    최소 repeat번, 측정 시간 합이 min_time초 이상이 될 때까지 (최대 max_repeat번) 측정해
+    초당 처리량의 중앙값과 최댓값을 반환
+    """
+    rates, measured = [], 0.0
+    while len(rates) < repeat or (measured < min_time and len(rates) < max_repeat):
+        run = fn(n)
+        start = time.perf_counter()
+        done = run()
+        elapsed = time.perf_counter() - start
+        measured += elapsed
+        rates.append(done / elapsed)
+    return {"median": statistics.median(rates), "best": max(rates), "runs": len(rates)}
+
+
+def environment_info():
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    try:
+        import torch
+        info["torch"] = torch.__version__
+    except ImportError:
+        pass
+    try:
+        info["git_commit"] = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return info
+
+
+def settings_mismatch(settings, baseline):
+    """기준 결과와 측정 조건(n)이 다르면 설명 문자열을, 같으면 None을 반환"""
+    base = baseline.get("settings")
+    if base is None:
+        print("⚠️ 기준 결과에 측정 조건(settings)이 없어 n이 같은지 확인할 수 없습니다.")
+        return None
+    if base.get("n") != settings["n"]:
+        return (f"측정 크기가 다릅니다 (기준 n={base.get('n')}, quick={base.get('quick')} / "
+                f"현재 n={settings['n']}, quick={settings['quick']})")
+    return None
+
+
+def compare(results, baseline, threshold):
+    """기준 대비 중앙값 처리량 변화율을 출력하고, threshold보다 많이 떨어진 항목 이름을 반환"""
+    regressions = []
+    print(f"\n{'benchmark':32s} {'baseline':>14s} {'current':>14s} {'change':>9s}")
+    for name, current in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            print(f"{name:32s} {'-':>14s} {current['median']:14.0f} {'new':>9s}")
+            continue
+        change = current["median"] / base["median"] - 1
+        mark = ""
+        if change < -threshold:
+            regressions.append(name)
+            mark = "  ❌ 성능 저하"
+        print(f"{name:32s} {base['median']:14.0f} {current['median']:14.0f} {change:+8.1%}{mark}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="소코반 RL 스택 처리량 벤치마크")
+    parser.add_argument("--output", "-o", default=None, help="결과 JSON 저장 경로")
+    parser.add_argument("--compare", default=None, help="비교할 이전 결과 JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="허용하는 처리량 감소 비율 (기본 0.10)")
+    parser.add_argument("--filter", default=None, help="이름에 이 문자열이 들어간 항목만 실행")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="측정 크기를 줄여 빠르게 실행 (--quick 기준 결과와만 비교 가능)")
+    parser.add_argument("--list", action="store_true", help="벤치마크 목록만 출력")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+
+    # quick 모드는 한 번 측정이 짧아 잡음이 크므로 최소 3회, 항목당 1초 이상 측정
+    n = 5_000 if args.quick else 50_000
+    repeat = max(3, args.repeat) if args.quick else args.repeat
+    min_time = 1.0 if args.quick else 0.0
+    settings = {"n": n, "quick": args.quick, "repeat": repeat, "min_time": min_time}
+    np.random.seed(0)
+    random.seed(0)
+
+    # 증분 렌더링이 빠르기만 하고 틀리면 안 되므로 rgb_array 항목 전에 전체 렌더와 같은지 확인
+    if not args.filter or args.filter in "env_step[rgb_array]":
+        mismatches = check_incremental_render()
+        for size, step, diff in mismatches:
+            print(f"❌ 증분 렌더링 불일치: {size[0]}x{size[1]}, {step}번째 스텝에서 {diff}픽셀")
+        if mismatches:
+            return 1
+
+    results = {}
+    for name, (fn, unit) in BENCHMARKS.items():
+        if args.filter and args.filter not in name:
+            continue
+        result = run_benchmark(fn, n, repeat, min_time)
+        result["unit"] = f"{unit}/s"
+        results[name] = result
+        print(f"{name:32s} {result['median']:14.0f} {unit}/s")
+
+    report = {"environment": environment_info(), "settings": settings, "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 결과 저장: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        mismatch = settings_mismatch(settings, baseline)
+        if mismatch:
+            print(f"\n비교할 수 없습니다: {mismatch}")
+            return 2
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)}개 항목이 {args.threshold:.0%} 넘게 느려졌습니다: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,8 +3,9 @@ import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from collections import deque
+from collections import OrderedDict, deque
 import random
+from stable_baselines3.common.vec_env import VecEnvWrapper
 
 # RND의 타겟/예측 네트워크를 위한 간단한 신경망 구조
 def build_network(input_dim, output_dim):
@@ -44,7 +45,19 @@ class RunningMeanStd:
         self.count = tot_count
 
 class RNDRewardWrapper(gym.Wrapper):
-    def __init__(self, env: gym.Env, feature_dim: int = 128, lr: float = 1e-4, intrinsic_reward_coef: float = 0.01):
+    """
+    RND 내재적 보상 래퍼
+
+    스텝마다 관찰을 한 번만 정규화하고, 예측 네트워크 순전파 1회로 보상 계산과 학습을 함께 합니다.
+    타겟 네트워크는 고정이므로 출력은 관찰 바이트를 키로 하는 LRU 캐시(target_cache_size개)에 보관합니다.
+    캐시 값이 계속 유효하도록, 처음 target_cache_warmup 스텝 동안만 관찰 정규화 통계(obs_rms)를
+    갱신하고 그 뒤로는 통계를 고정한 채 캐시를 사용합니다. 정규화가 바뀌어 내재적 보상도 달라지므로
+    캐시는 선택 사항입니다: 기본값 target_cache_size=0이면 캐시를 쓰지 않고 통계도 계속 갱신합니다
+    (원래 RND 방식). 예: target_cache_size=4096
+    """
+
+    def __init__(self, env: gym.Env, feature_dim: int = 128, lr: float = 1e-4, intrinsic_reward_coef: float = 0.01,
+                 target_cache_size: int = 0, target_cache_warmup: int = 2_000):
         super().__init__(env)
         
         self.intrinsic_reward_coef = intrinsic_reward_coef # 가중치 저장
@@ -70,47 +83,67 @@ class RNDRewardWrapper(gym.Wrapper):
         # 4. 내재적 보상 정규화를 위한 값 저장
         self.reward_buffer = deque(maxlen=1000)
 
-    def _compute_intrinsic_reward(self, obs: np.ndarray):
-        # 관찰을 1차원으로 펼치고 정규화
+        # 5. 타겟 네트워크 출력 캐시 (관찰 바이트 → 특징 벡터)
+        self.target_cache = OrderedDict()
+        self.target_cache_size = target_cache_size
+        self.target_cache_warmup = target_cache_warmup
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._num_steps = 0
+
+    @property
+    def cache_hit_rate(self):
+        total = self.cache_hits + self.cache_misses
+        return self.cache_hits / total if total else 0.0
+
+    @property
+    def _cache_active(self):
+        return self.target_cache_size > 0 and self._num_steps > self.target_cache_warmup
+
+    def _normalize(self, obs: np.ndarray):
+        # 관찰을 1차원으로 펼치고 통계 갱신 후 정규화 (스텝당 한 번만)
+        # 캐시 사용 중에는 통계를 고정해야 캐시된 타겟 출력이 현재 정규화와 일치함
         obs = obs.flatten()
-        self.obs_rms.update(np.expand_dims(obs, 0))
+        if not self._cache_active:
+            self.obs_rms.update(np.expand_dims(obs, 0))
         normalized_obs = (obs - self.obs_rms.mean) / np.sqrt(self.obs_rms.var + 1e-8)
         normalized_obs = np.clip(normalized_obs, -5, 5) # 클리핑
+        return torch.from_numpy(normalized_obs).float().unsqueeze(0)
 
-        # 텐서로 변환
-        obs_tensor = torch.from_numpy(normalized_obs).float().unsqueeze(0)
+    def _target_features(self, obs: np.ndarray, obs_tensor: torch.Tensor):
+        # 같은 보드 상태가 반복되므로 타겟 네트워크 출력은 LRU 캐시에서 재사용
+        key = obs.tobytes()
+        features = self.target_cache.get(key)
+        if features is not None:
+            self.cache_hits += 1
+            self.target_cache.move_to_end(key)
+            return features
 
-        # 타겟과 예측값 계산
-        target_features = self.target_network(obs_tensor)
-        predictor_features = self.predictor_network(obs_tensor)
+        self.cache_misses += 1
+        with torch.no_grad():
+            features = self.target_network(obs_tensor)
+        self.target_cache[key] = features
+        if len(self.target_cache) > self.target_cache_size:
+            self.target_cache.popitem(last=False)
+        return features
 
-        # 내재적 보상 = 예측 오차 (MSE)
-        intrinsic_reward = nn.functional.mse_loss(predictor_features, target_features, reduction='none').mean().item()
-        
-        return intrinsic_reward
+    def step(self, action):
+        obs, reward, terminated, truncated, info = self.env.step(action)
 
-    def _update_predictor(self, obs: np.ndarray):
-        # 예측 네트워크 업데이트 (학습)
-        obs = obs.flatten()
-        normalized_obs = (obs - self.obs_rms.mean) / np.sqrt(self.obs_rms.var + 1e-8)
-        normalized_obs = np.clip(normalized_obs, -5, 5)
-        
-        obs_tensor = torch.from_numpy(normalized_obs).float().unsqueeze(0)
+        self._num_steps += 1
 
-        target_features = self.target_network(obs_tensor)
+        # 1. 정규화 1회 + 타겟(캐시)/예측 순전파 1회
+        obs_tensor = self._normalize(obs)
+        if self._cache_active:
+            target_features = self._target_features(obs, obs_tensor)
+        else:
+            with torch.no_grad():
+                target_features = self.target_network(obs_tensor)
         predictor_features = self.predictor_network(obs_tensor)
-        
         loss = nn.functional.mse_loss(predictor_features, target_features)
 
-        self.optimizer.zero_grad()
-        loss.backward()
-        self.optimizer.step()
-
-    def step(self, action):
-        obs, reward, terminated, truncated, info = self.env.step(action)
-        
-        # 1. 내재적 보상 계산
-        intrinsic_reward = self._compute_intrinsic_reward(obs)
+        # 내재적 보상 = 예측 오차 (MSE)
+        intrinsic_reward = loss.item()
         self.reward_buffer.append(intrinsic_reward)
 
         # 2. 보상 정규화 (보상 스케일 안정화)
@@ -119,13 +152,122 @@ class RNDRewardWrapper(gym.Wrapper):
             std_rew = np.std(self.reward_buffer)
             intrinsic_reward /= (std_rew + 1e-8)
 
-        # 3. 예측 네트워크 업데이트
-        self._update_predictor(obs)
+        # 3. 예측 네트워크 업데이트 (위에서 계산한 loss 재사용)
+        self.optimizer.zero_grad()
+        loss.backward()
+        self.optimizer.step()
 
         # 외재적 보상 + 내재적 보상
         total_reward = reward + self.intrinsic_reward_coef * intrinsic_reward
+        info["rnd_cache_hit_rate"] = self.cache_hit_rate
         
         return obs, total_reward, terminated, truncated, info
 
     def reset(self, **kwargs):
-        return self.env.reset(**kwargs)
\ No newline at end of file
+        return self.env.reset(**kwargs)
+
+
+class VecRNDRewardWrapper(VecEnvWrapper):
+    """
+    VecEnv 단위 RND 래퍼
+
+    RNDRewardWrapper는 환경마다 관찰 1개씩 신경망을 돌리고 매 스텝 Adam 업데이트를 하지만,
+    여기서는 N개 환경의 관찰을 한 번의 순전파로 처리하고,
+    update_every 스텝마다 모아 둔 관찰을 미니배치로 나눠 예측 네트워크를 학습합니다.
+    내재적 보상 정규화도 deque 대신 RunningMeanStd로 누적 계산합니다.
+    """
+
+    def __init__(self, venv, feature_dim: int = 128, lr: float = 1e-4, intrinsic_reward_coef: float = 0.01,
+                 update_every: int = 8, minibatch_size: int = 256):
+        super().__init__(venv)
+
+        self.intrinsic_reward_coef = intrinsic_reward_coef
+        self.update_every = update_every
+        self.minibatch_size = minibatch_size
+
+        self.obs_dim = int(np.prod(self.observation_space.shape))
+
+        self.target_network = build_network(self.obs_dim, feature_dim)
+        self.predictor_network = build_network(self.obs_dim, feature_dim)
+        for param in self.target_network.parameters():
+            param.requires_grad = False
+        self.optimizer = optim.Adam(self.predictor_network.parameters(), lr=lr)
+
+        self.obs_rms = RunningMeanStd(shape=(self.obs_dim,))
+        self.reward_rms = RunningMeanStd(shape=())
+
+        # 예측 네트워크 학습용으로 모아 둔 정규화 관찰
+        self._pending = []
+        self._num_steps = 0
+
+    def _normalize(self, flat_obs):
+        normalized = (flat_obs - self.obs_rms.mean) / np.sqrt(self.obs_rms.var + 1e-8)
+        return torch.from_numpy(np.clip(normalized, -5, 5)).float()
+
+    def _update_predictor(self):
+        batch = torch.cat(self._pending)
+        self._pending.clear()
+        for idx in torch.randperm(len(batch)).split(self.minibatch_size):
+            obs_tensor = batch[idx]
+            loss = nn.functional.mse_loss(self.predictor_network(obs_tensor), self.target_network(obs_tensor))
+            self.optimizer.zero_grad()
+            loss.backward()
+            self.optimizer.step()
+
+    def reset(self):
+        return self.venv.reset()
+
+    def step_wait(self):
+        obs, rewards, dones, infos = self.venv.step_wait()
+
+        # 끝난 환경은 자동 리셋된 관찰 대신 마지막 관찰로 보상을 계산 (RNDRewardWrapper와 동일)
+        next_obs = obs
+        if np.any(dones):
+            next_obs = obs.copy()
+            for i in np.nonzero(dones)[0]:
+                next_obs[i] = infos[i]["terminal_observation"]
+
+        flat_obs = next_obs.reshape(self.num_envs, -1).astype(np.float64)
+        self.obs_rms.update(flat_obs)
+        obs_tensor = self._normalize(flat_obs)
+
+        # 1. 배치 전체의 내재적 보상을 한 번의 순전파로 계산
+        with torch.no_grad():
+            error = self.predictor_network(obs_tensor) - self.target_network(obs_tensor)
+        intrinsic_rewards = error.pow(2).mean(dim=1).numpy()
+
+        # 2. 보상 정규화 (누적 표준편차)
+        self.reward_rms.update(intrinsic_rewards)
+        intrinsic_rewards = intrinsic_rewards / np.sqrt(self.reward_rms.var + 1e-8)
+
+        # 3. update_every 스텝마다 모아 둔 관찰로 예측 네트워크 학습
+        self._pending.append(obs_tensor)
+        self._num_steps += 1
+        if self._num_steps % self.update_every == 0:
+            self._update_predictor()
+
+        total_rewards = rewards + self.intrinsic_reward_coef * intrinsic_rewards.astype(rewards.dtype)
+        return obs, total_rewards, dones, infos
+
+
+# 단독 실행 시: RNDRewardWrapper(환경별) vs VecRNDRewardWrapper 초당 스텝 수 비교
+if __name__ == '__main__':
+    import time
+    from stable_baselines3.common.vec_env import DummyVecEnv
+    from sokoban_env import SokobanEnv
+    from sokoban_vec_env import SokobanVecEnv
+
+    def measure(env, n_steps):
+        env.reset()
+        actions = np.random.randint(0, 4, size=(n_steps, env.num_envs))
+        start = time.perf_counter()
+        for a in actions:
+            env.step(a)
+        return n_steps * env.num_envs / (time.perf_counter() - start)
+
+    for n in (1, 16, 64):
+        per_env = measure(DummyVecEnv([lambda: RNDRewardWrapper(SokobanEnv()) for _ in range(n)]), 2000 // n + 10)
+        batched_dummy = measure(VecRNDRewardWrapper(DummyVecEnv([SokobanEnv for _ in range(n)])), 4000 // n + 10)
+        batched = measure(VecRNDRewardWrapper(SokobanVecEnv(n)), 20000 // n + 10)
+        print(f"N={n:3d}  RNDRewardWrapper: {per_env:8.0f} steps/s  "
+              f"VecRND+DummyVecEnv: {batched_dummy:8.0f} steps/s  VecRND+SokobanVecEnv: {batched:8.0f} steps/s")
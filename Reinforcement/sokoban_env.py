@@ -1,17 +1,43 @@
 import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
-from sokoban_game import SokobanGame # 게임 클래스 import
+from sokoban_game import SokobanGame, SCREEN_WIDTH, SCREEN_HEIGHT, TILE_SIZE # 게임 클래스 import
 import pygame # pygame을 import해야 display를 사용할 수 있습니다.
 
+MAX_EPISODE_STEPS = 200 # 에피소드 최대 길이 (초과 시 truncated)
+
 class SokobanEnv(gym.Env):
-    def __init__(self, render_mode=None):
+    """
+    소코반 gymnasium 환경
+
+    render_mode: None, "human"(pygame 창) 또는 "rgb_array"(render()가 (높이, 폭, 3) uint8 배열 반환)
+    engine: "set"(기본) 또는 "array" 상태 엔진
+    level_bank: 미리 생성한 레벨 목록 (없으면 매 리셋마다 생성)
+    render_size: rgb_array 프레임의 (폭, 높이)
+    render_copy: True(기본)면 render()가 매번 새 배열을 반환합니다. False면 내부 프레임 버퍼의 뷰를
+        그대로 돌려주어 복사 비용이 없지만, 다음 render() 호출에서 내용이 덮어써지므로
+        프레임을 리스트에 쌓거나 RecordVideo로 녹화할 때는 쓰면 안 됩니다 (바로 소비하는 루프 전용).
+    """
+
+    metadata = {"render_modes": ["human", "rgb_array"], "render_fps": 30}
+
+    def __init__(self, render_mode=None, engine="set", level_bank=None,
+                 render_size=(SCREEN_WIDTH, SCREEN_HEIGHT), render_copy=True):
         super().__init__()
-        self.game = SokobanGame()
+        # engine="array"면 배열 기반 상태 엔진, level_bank를 주면 미리 생성한 레벨 사용
+        self.game = SokobanGame(engine=engine, level_bank=level_bank)
+        if render_mode is not None and render_mode not in self.metadata["render_modes"]:
+            raise ValueError(f"지원하지 않는 render_mode: {render_mode}")
         self.render_mode = render_mode
         self.steps_taken = 0
         self._surface = None # surface를 인스턴스 변수로 초기화
 
+        # rgb_array: (폭, 높이) 해상도, 칸 크기는 800x600 기준 비율로 맞춤
+        self.render_size = tuple(render_size)
+        self.render_copy = render_copy
+        self._tile_size = max(4, int(TILE_SIZE * min(render_size[0] / SCREEN_WIDTH, render_size[1] / SCREEN_HEIGHT)))
+        self._frame = None
+
         self.action_space = spaces.Discrete(4)
         self.observation_space = spaces.Box(
             low=0, high=4,
@@ -22,7 +48,7 @@ class SokobanEnv(gym.Env):
     def step(self, action):
         obs, reward, terminated = self.game.step(action)
         self.steps_taken += 1
-        truncated = self.steps_taken >= 200
+        truncated = self.steps_taken >= MAX_EPISODE_STEPS
         obs_with_channel = np.expand_dims(obs, axis=0)
         return obs_with_channel, reward, terminated, truncated, {}
 
@@ -34,6 +60,16 @@ class SokobanEnv(gym.Env):
         return obs_with_channel, {}
 
     def render(self):
+        if self.render_mode == "rgb_array":
+            if self._surface is None:
+                # 오프스크린 surface의 픽셀 메모리를 NumPy 배열이 직접 소유 → 그린 결과가 곧 프레임
+                width, height = self.render_size
+                self._frame = np.zeros((height, width, 3), dtype=np.uint8)
+                self._surface = pygame.image.frombuffer(self._frame, (width, height), "RGB")
+            # 바뀐 칸만 다시 그림
+            self.game.render_incremental(self._surface, self._tile_size)
+            return self._frame.copy() if self.render_copy else self._frame
+
         if self.render_mode == "human":
             # Pygame 창(surface)이 없으면 생성합니다.
             if self._surface is None:
@@ -41,15 +77,16 @@ class SokobanEnv(gym.Env):
                 pygame.display.set_caption("Sokoban AI")
                 self._surface = pygame.display.set_mode((800, 600))
             
-            # 게임 로직을 사용해 surface에 그림을 그립니다.
-            self.game.render(self._surface)
+            # 게임 로직을 사용해 surface에 그림을 그립니다. (바뀐 칸만)
+            dirty = self.game.render_incremental(self._surface)
             
             # --- 여기가 수정된 부분 ---
-            # 메모리에 그려진 그림을 실제 화면으로 업데이트(갱신)합니다.
-            pygame.display.flip() # <<-- 이 줄 추가
+            # 메모리에 그려진 그림 중 바뀐 영역만 실제 화면으로 업데이트(갱신)합니다.
+            pygame.display.update(dirty)
 
     def close(self):
-        if self._surface is not None:
+        if self._surface is not None and self.render_mode == "human":
             pygame.display.quit()
             pygame.quit()
-            self._surface = None
\ No newline at end of file
+        self._surface = None
+        self._frame = None
\ No newline at end of file
@@ -24,6 +24,22 @@ SUBSCRIBE_EVENT = pygame.USEREVENT + 1      # 클리어 직후 발행되는 구
 NEXT_LEVEL_EVENT = pygame.USEREVENT + 2     # 다음 레벨 자동 진행 이벤트
 NEXT_LEVEL_DELAY_MS = 1500                  # 몇 ms 뒤 새 게임
 
+# --- 액션 ---
+MOVE_MAP = {0: (0, -1), 1: (0, 1), 2: (-1, 0), 3: (1, 0)}  # 위, 아래, 왼쪽, 오른쪽
+DELTA_TO_ACTION = {delta: action for action, delta in MOVE_MAP.items()}
+
+# --- 보상 ---
+STEP_PENALTY = -0.5          # 매 스텝 비용
+BOX_ON_TARGET_REWARD = 10    # 목표 위 박스 수 증감 시 +/-
+WIN_REWARD = 80              # 모든 박스를 목표에 올렸을 때
+
+# --- 배열 엔진(engine="array")용 셀 플래그 ---
+CELL_BOX = 1
+CELL_TARGET = 2
+TILE_PLAYER = 4  # 렌더링용 칸 코드에서만 사용
+# 셀 플래그 → 관찰값 (0: 빈 공간, 2: 박스, 3: 목표, 4: 목표 위의 박스)
+OBS_LUT = np.array([0, 2, 3, 4], dtype=np.uint8)
+
 def make_aa_rounded_rect(size, color, radius, aa_scale=AA_SCALE):
     """슈퍼샘플링을 이용해 가장자리가 매끈한 둥근 사각형 Surface 생성"""
     w, h = size
@@ -40,12 +56,56 @@ def draw_aa_circle(surface, x, y, r, color):
     gfxdraw.filled_circle(surface, x, y, r, color)
     gfxdraw.aacircle(surface, x, y, r, color)
 
+def build_neighbor_table(width, height):
+    """칸 인덱스(r * width + c)별로 액션 방향의 이웃 인덱스 표 (맵 밖이면 -1)"""
+    table = []
+    for idx in range(width * height):
+        r, c = divmod(idx, width)
+        row = []
+        for action in range(len(MOVE_MAP)):
+            dx, dy = MOVE_MAP[action]
+            nc, nr = c + dx, r + dy
+            row.append(nr * width + nc if 0 <= nc < width and 0 <= nr < height else -1)
+        table.append(tuple(row))
+    return tuple(table)
+
 class SokobanGame:
-    def __init__(self):
+    ENGINES = ("set", "array")
+
+    def __init__(self, engine="set", level_bank=None):
+        """
+        engine: 상태 엔진 선택
+            "set"   - 좌표 튜플의 set으로 상태를 관리 (기본값)
+            "array" - 평탄화된 uint8 배열 + 미리 계산한 이웃 표로 관리.
+                      step/승리 판정/관찰 생성이 O(1) 배열 연산이며 결과는 "set"과 동일
+        level_bank: sokoban_levels.LevelBank를 주면 reset() 때 무작위 생성 대신
+                    미리 만들어 둔 (풀 수 있는) 레벨 중 하나를 꺼내 씀
+        """
+        if engine not in self.ENGINES:
+            raise ValueError(f"engine은 {self.ENGINES} 중 하나여야 합니다: {engine!r}")
+        self.engine = engine
+
         self.map_width = 6
         self.map_height = 6
         self.num_boxes = 2
 
+        self.level_bank = level_bank
+        if level_bank is not None and (level_bank.map_width, level_bank.map_height, level_bank.num_boxes) != (
+                self.map_width, self.map_height, self.num_boxes):
+            raise ValueError("레벨 뱅크의 맵 크기/박스 수가 게임 설정과 다릅니다.")
+
+        # 배열 엔진 상태: 칸마다 CELL_BOX/CELL_TARGET 비트를 담는 bytearray와
+        # 이를 복사 없이 바라보는 NumPy 뷰(관찰 생성용)
+        self._neighbors = build_neighbor_table(self.map_width, self.map_height)
+        self._idx_to_pos = tuple(
+            (idx % self.map_width, idx // self.map_width)
+            for idx in range(self.map_width * self.map_height)
+        )
+        self._cells = bytearray(self.map_width * self.map_height)
+        self._cells_view = np.frombuffer(self._cells, dtype=np.uint8)
+        self._player_idx = 0
+        self._boxes_on_target = 0
+
         # 바깥 벽과 닿는 링(가장자리 1칸)에는 박스 생성 금지
         self.box_spawn_margin = 1
 
@@ -55,6 +115,7 @@ class SokobanGame:
 
         # 상태/표시 관련
         self._surface_cache = {}
+        self._render_state = None  # 마지막으로 그린 (surface, tile_size, 칸 코드)
         self.game_state = "playing"
         self.win_event_fired = False
         self.show_subscribe_prompt = False
@@ -67,7 +128,10 @@ class SokobanGame:
 
     def reset(self):
         """게임을 초기 상태로 리셋"""
-        level_data = self._generate_random_level_data()
+        if self.level_bank is not None:
+            level_data = self.level_bank.sample()
+        else:
+            level_data = self._generate_random_level_data()
         self._load_level_from_data(level_data)
         self.game_state = "playing"
         self.win_event_fired = False
@@ -99,9 +163,28 @@ class SokobanGame:
         self.player_pos = level_data["player"]
         self.box_positions = set(level_data["boxes"])
         self.target_positions = set(level_data["targets"])
+        if self.engine == "array":
+            self._load_array_state()
+
+    def _load_array_state(self):
+        """set 상태로부터 배열 엔진 상태를 구성"""
+        w = self.map_width
+        cells = self._cells
+        cells[:] = bytes(len(cells))
+        for c, r in self.box_positions:
+            cells[r * w + c] |= CELL_BOX
+        for c, r in self.target_positions:
+            cells[r * w + c] |= CELL_TARGET
+        self._player_idx = self.player_pos[1] * w + self.player_pos[0]
+        self._boxes_on_target = len(self.box_positions & self.target_positions)
 
     def get_observation(self):
         """AI를 위한 숫자 그리드 관찰(observation)"""
+        if self.engine == "array":
+            flat = OBS_LUT[self._cells_view]
+            flat[self._player_idx] = 1
+            return flat.reshape(self.map_height, self.map_width)
+
         grid = np.zeros((self.map_height, self.map_width), dtype=np.uint8)
         # 0: 빈 공간, 1: 플레이어, 2: 박스, 3: 목표, 4: 목표 위의 박스
         for r in range(self.map_height):
@@ -120,27 +203,34 @@ class SokobanGame:
 
     def step(self, action):
         """AI 액션 처리"""
-        move_map = {0: (0, -1), 1: (0, 1), 2: (-1, 0), 3: (1, 0)}
-        dx, dy = move_map[action]
-
-        before = len(self.box_positions.intersection(self.target_positions))
-        self._move_player(dx, dy)
-        after = len(self.box_positions.intersection(self.target_positions))
-
-        reward = -0.5
+        if self.engine == "array":
+            before = self._boxes_on_target
+            self._move_player_array(action)
+            after = self._boxes_on_target
+        else:
+            dx, dy = MOVE_MAP[action]
+            before = len(self.box_positions.intersection(self.target_positions))
+            self._move_player(dx, dy)
+            after = len(self.box_positions.intersection(self.target_positions))
+
+        reward = STEP_PENALTY
         if after > before:
-            reward += 10
+            reward += BOX_ON_TARGET_REWARD
         elif after < before:
-            reward -= 10
+            reward -= BOX_ON_TARGET_REWARD
 
         done = self._check_win_condition()
         if done:
-            reward += 80
+            reward += WIN_REWARD
 
         return self.get_observation(), reward, done
 
     def _move_player(self, dx, dy):
         """플레이어 이동"""
+        if self.engine == "array":
+            self._move_player_array(DELTA_TO_ACTION[(dx, dy)])
+            return
+
         px, py = self.player_pos
         npos = (px + dx, py + dy)
 
@@ -156,64 +246,136 @@ class SokobanGame:
 
         self.player_pos = npos
 
+    def _move_player_array(self, action):
+        """배열 엔진의 플레이어 이동 (렌더링용 set 상태도 함께 갱신)"""
+        cells = self._cells
+        npos = self._neighbors[self._player_idx][action]
+        if npos < 0:
+            return
+
+        if cells[npos] & CELL_BOX:
+            nb = self._neighbors[npos][action]
+            if nb < 0 or cells[nb] & CELL_BOX:
+                return
+            cells[npos] ^= CELL_BOX
+            cells[nb] |= CELL_BOX
+            self._boxes_on_target += (cells[nb] >> 1) - (cells[npos] >> 1)
+            self.box_positions.remove(self._idx_to_pos[npos])
+            self.box_positions.add(self._idx_to_pos[nb])
+
+        self._player_idx = npos
+        self.player_pos = self._idx_to_pos[npos]
+
     def _check_win_condition(self):
+        if self.engine == "array":
+            return self._boxes_on_target == len(self.target_positions) == len(self.box_positions)
         return self.box_positions == self.target_positions
 
     # ---- 렌더링 캐시 ----
-    def _cached_tile(self, key, color, radius):
+    def _cached_tile(self, key, color, radius, tile_size=TILE_SIZE):
         if key not in self._surface_cache:
-            surf = make_aa_rounded_rect((TILE_SIZE, TILE_SIZE), color, radius)
+            surf = make_aa_rounded_rect((tile_size, tile_size), color, radius)
             if pygame.get_init() and pygame.display.get_init():
                 surf = surf.convert_alpha()
             self._surface_cache[key] = surf
         return self._surface_cache[key]
 
-    def render(self, surface):
-        """현재 게임 상태를 그림"""
+    def _tile_codes(self):
+        """칸별 그리기 코드 (CELL_BOX | CELL_TARGET | TILE_PLAYER 비트), 길이 W*H"""
+        w = self.map_width
+        if self.engine == "array":
+            codes = self._cells_view.copy()
+        else:
+            codes = np.zeros(self.map_width * self.map_height, dtype=np.uint8)
+            for c, r in self.box_positions:
+                codes[r * w + c] |= CELL_BOX
+            for c, r in self.target_positions:
+                codes[r * w + c] |= CELL_TARGET
+        codes[self.player_pos[1] * w + self.player_pos[0]] |= TILE_PLAYER
+        return codes
+
+    def _board_origin(self, surface, tile_size):
+        """보드 왼쪽 위 픽셀 좌표 (surface 가운데 정렬)"""
+        sw, sh = surface.get_size()
+        return (sw - self.map_width * tile_size) // 2, (sh - self.map_height * tile_size) // 2
+
+    def _draw_tile(self, surface, idx, code, origin, tile_size, clear=True):
+        """칸 하나를 그리고 그 영역(Rect)을 반환"""
+        rect = pygame.Rect(origin[0] + (idx % self.map_width) * tile_size,
+                           origin[1] + (idx // self.map_width) * tile_size,
+                           tile_size, tile_size)
+        if clear:
+            surface.fill(COLOR_BACKGROUND, rect)
+            # 가장자리 칸은 둥근 외곽 프레임의 안쪽 모서리와 겹치므로 그 부분의 프레임을 다시 그림
+            col, row = idx % self.map_width, idx // self.map_width
+            if col in (0, self.map_width - 1) or row in (0, self.map_height - 1):
+                surface.set_clip(rect)
+                self._draw_wall_frame(surface, origin, tile_size)
+                surface.set_clip(None)
+
+        rr = min(max(8, tile_size // 6), tile_size // 2)
+        if code & CELL_TARGET:
+            surface.blit(self._cached_tile(("target", tile_size), COLOR_TARGET, rr, tile_size), rect.topleft)
+        if code & CELL_BOX:
+            if code & CELL_TARGET:
+                tile = self._cached_tile(("box_on_target", tile_size), COLOR_BOX_ON_TARGET, rr, tile_size)
+            else:
+                tile = self._cached_tile(("box", tile_size), COLOR_BOX, rr, tile_size)
+            surface.blit(tile, rect.topleft)
+
+        if code & TILE_PLAYER:
+            # 플레이어(AA 원)
+            pr = max(1, tile_size // 2 - max(1, tile_size // 12))
+            draw_aa_circle(surface, rect.centerx, rect.centery, pr, COLOR_PLAYER)
+        return rect
+
+    def _draw_wall_frame(self, surface, origin, tile_size):
+        """보드를 둘러싼 둥근 외곽 벽 프레임"""
+        wall = max(1, WALL_THICKNESS * tile_size // TILE_SIZE)
+        board_rect = pygame.Rect(origin[0], origin[1], self.map_width * tile_size, self.map_height * tile_size)
+        pygame.draw.rect(surface, COLOR_WALL, board_rect.inflate(wall * 2, wall * 2), width=wall,
+                         border_radius=max(1, 15 * tile_size // TILE_SIZE))
+
+    def render(self, surface, tile_size=TILE_SIZE):
+        """현재 게임 상태를 그림 (보드는 surface 가운데에 tile_size 픽셀 칸으로)"""
         surface.fill(COLOR_BACKGROUND)
-        map_w_px = self.map_width * TILE_SIZE
-        map_h_px = self.map_height * TILE_SIZE
-        offset_x = (SCREEN_WIDTH - map_w_px) // 2
-        offset_y = (SCREEN_HEIGHT - map_h_px) // 2
+        origin = self._board_origin(surface, tile_size)
 
         # 외곽 벽 프레임
-        wall_frame_rect = pygame.Rect(offset_x, offset_y, map_w_px, map_h_px).inflate(WALL_THICKNESS + 10, WALL_THICKNESS + 10)
-        pygame.draw.rect(surface, COLOR_WALL, wall_frame_rect, width=WALL_THICKNESS, border_radius=15)
-
-        def to_px(pos):
-            return (offset_x + pos[0] * TILE_SIZE, offset_y + pos[1] * TILE_SIZE)
-
-        rr = max(8, TILE_SIZE // 6)
-        target_tile = self._cached_tile(("target", TILE_SIZE), COLOR_TARGET, rr)
-        box_tile = self._cached_tile(("box", TILE_SIZE), COLOR_BOX, rr)
-        box_on_target_tile = self._cached_tile(("box_on_target", TILE_SIZE), COLOR_BOX_ON_TARGET, rr)
-
-        for pos in self.target_positions:
-            px, py = to_px(pos)
-            surface.blit(target_tile, (px, py))
-
-        for pos in self.box_positions:
-            px, py = to_px(pos)
-            tile = box_on_target_tile if pos in self.target_positions else box_tile
-            surface.blit(tile, (px, py))
+        self._draw_wall_frame(surface, origin, tile_size)
 
-        # 플레이어(AA 원)
-        px, py = to_px(self.player_pos)
-        cx = px + TILE_SIZE // 2
-        cy = py + TILE_SIZE // 2
-        pr = TILE_SIZE // 2 - 5
-        draw_aa_circle(surface, cx, cy, pr, COLOR_PLAYER)
+        codes = self._tile_codes()
+        for idx in np.flatnonzero(codes):
+            self._draw_tile(surface, idx, codes[idx], origin, tile_size, clear=False)
+        self._render_state = (surface, tile_size, codes)
 
         # 클리어/구독 오버레이
         if self.show_subscribe_prompt and self.font_small:
             msg1 = self.font_small.render("LEVEL CLEAR!", True, (0, 150, 0))
             msg2 = self.font_small.render("Press S to Subscribe", True, COLOR_TEXT)
-            surface.blit(msg1, (SCREEN_WIDTH // 2 - msg1.get_width() // 2, 20))
-            surface.blit(msg2, (SCREEN_WIDTH // 2 - msg2.get_width() // 2, 60))
+            surface.blit(msg1, (surface.get_width() // 2 - msg1.get_width() // 2, 20))
+            surface.blit(msg2, (surface.get_width() // 2 - msg2.get_width() // 2, 60))
         elif self._check_win_condition() and self.font_small:
             # 타이머 대기 중에도 상단에 간단히 표시
             msg = self.font_small.render("LEVEL CLEAR!", True, (0, 150, 0))
-            surface.blit(msg, (SCREEN_WIDTH // 2 - msg.get_width() // 2, 20))
+            surface.blit(msg, (surface.get_width() // 2 - msg.get_width() // 2, 20))
+
+    def render_incremental(self, surface, tile_size=TILE_SIZE):
+        """
+        직전 프레임과 달라진 칸만 다시 그리고, 다시 그린 영역(Rect) 리스트를 반환.
+        같은 surface/tile_size로 처음 그리거나 오버레이 글꼴을 쓰는 경우에는 전체를 그림.
+        """
+        state = self._render_state
+        if state is None or state[0] is not surface or state[1] != tile_size or self.font_small:
+            self.render(surface, tile_size)
+            return [surface.get_rect()]
+
+        codes = self._tile_codes()
+        origin = self._board_origin(surface, tile_size)
+        dirty = [self._draw_tile(surface, idx, codes[idx], origin, tile_size)
+                 for idx in np.flatnonzero(codes != state[2])]
+        self._render_state = (surface, tile_size, codes)
+        return dirty
 
     def run_for_human(self):
         """사람 플레이용 메인 루프"""
@@ -0,0 +1,192 @@
+"""
+풀 수 있음이 보장된 소코반 레벨 생성기와 레벨 뱅크
+
+- generate_reverse_play_level(): 목표 위에 박스를 놓고 플레이어가 박스를 "끌어당기며"
+  거꾸로 플레이해서 시작 상태를 만든다. 역재생 경로를 그대로 뒤집으면 해답이므로 항상 풀 수 있다.
+- 레벨 뱅크: 미리 생성한 레벨을 고정 길이 레코드로 담은 바이너리 파일.
+  LevelBank는 파일을 메모리 매핑해서 reset() 때 인덱싱만 하면 된다.
+
+사용 예:
+    python sokoban_levels.py build levels.bin --count 1000000 --workers 8
+    python sokoban_levels.py info levels.bin
+"""
+
+import multiprocessing as mp
+import random
+import struct
+
+import numpy as np
+
+from sokoban_game import MOVE_MAP
+
+# 파일 헤더: 매직, 버전, 폭, 높이, 박스 수, 레벨 수 (리틀 엔디언)
+BANK_MAGIC = b"SKBN"
+BANK_VERSION = 1
+BANK_HEADER = struct.Struct("<4sBBBBI")
+
+
+def generate_reverse_play_level(map_width=6, map_height=6, num_boxes=2,
+                                walk_steps=40, max_walk_steps=200, pull_prob=0.7, min_pulls=4, rng=random):
+    """
+    역재생(박스 끌기)으로 풀 수 있는 레벨을 하나 생성
+
+    walk_steps: 역재생 중 플레이어가 최소한 걷는 횟수
+    max_walk_steps: 이만큼 걸어도 조건을 못 채우면 처음부터 다시 생성
+    pull_prob: 뒤에 박스가 있을 때 끌어당길 확률
+    min_pulls: 박스를 최소 몇 번 끌어야 채택할지 (너무 쉬운 레벨 배제)
+    반환값은 SokobanGame._generate_random_level_data()와 같은 형식의 dict
+    """
+    all_coords = [(c, r) for c in range(map_width) for r in range(map_height)]
+    deltas = list(MOVE_MAP.values())
+
+    while True:
+        targets = rng.sample(all_coords, num_boxes)
+        boxes = set(targets)
+        player = rng.choice([p for p in all_coords if p not in boxes])
+        pulls = 0
+
+        for step in range(max_walk_steps):
+            # 시작할 때 목표 위에 박스가 없어야 함 (기존 무작위 생성기와 같은 조건)
+            if step >= walk_steps and pulls >= min_pulls and not boxes.intersection(targets):
+                return {"player": player, "boxes": boxes, "targets": set(targets)}
+
+            dx, dy = rng.choice(deltas)
+            npos = (player[0] + dx, player[1] + dy)
+            if not (0 <= npos[0] < map_width and 0 <= npos[1] < map_height) or npos in boxes:
+                continue
+            # 플레이어 뒤쪽 박스를 끌면서 이동 (정방향으로는 같은 박스를 반대로 미는 것)
+            behind = (player[0] - dx, player[1] - dy)
+            if behind in boxes and rng.random() < pull_prob:
+                boxes.remove(behind)
+                boxes.add(player)
+                pulls += 1
+            player = npos
+
+
+# ---- 레벨 뱅크 ----
+def encode_level(level_data, map_width):
+    """레벨 dict → [플레이어, 박스..., 목표...] 칸 인덱스 레코드"""
+    def idx(pos):
+        return pos[1] * map_width + pos[0]
+    return ([idx(level_data["player"])]
+            + sorted(idx(p) for p in level_data["boxes"])
+            + sorted(idx(p) for p in level_data["targets"]))
+
+
+def decode_level(record, map_width, num_boxes):
+    """칸 인덱스 레코드 → 레벨 dict"""
+    def pos(v):
+        return (v % map_width, v // map_width)
+    return {
+        "player": pos(record[0]),
+        "boxes": {pos(v) for v in record[1:1 + num_boxes]},
+        "targets": {pos(v) for v in record[1 + num_boxes:]},
+    }
+
+
+def write_level_bank(path, levels, map_width=6, map_height=6, num_boxes=2):
+    """레벨 dict 이터러블을 레벨 뱅크 파일로 저장 (스트리밍, 반환값은 저장한 레벨 수)"""
+    if map_width * map_height > 256:
+        raise ValueError("레벨 뱅크는 칸 인덱스를 uint8로 저장하므로 256칸 이하만 지원합니다.")
+
+    count = 0
+    with open(path, "wb") as f:
+        f.write(BANK_HEADER.pack(BANK_MAGIC, BANK_VERSION, map_width, map_height, num_boxes, 0))
+        chunk = []
+        for level in levels:
+            chunk.append(encode_level(level, map_width))
+            if len(chunk) >= 65536:
+                f.write(np.asarray(chunk, dtype=np.uint8).tobytes())
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            f.write(np.asarray(chunk, dtype=np.uint8).tobytes())
+            count += len(chunk)
+        # 레벨 수는 마지막에 헤더에 기록
+        f.seek(0)
+        f.write(BANK_HEADER.pack(BANK_MAGIC, BANK_VERSION, map_width, map_height, num_boxes, count))
+    return count
+
+
+class LevelBank:
+    """메모리 매핑된 레벨 뱅크 (여러 프로세스가 같은 페이지를 공유)"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            magic, version, w, h, k, count = BANK_HEADER.unpack(f.read(BANK_HEADER.size))
+        if magic != BANK_MAGIC or version != BANK_VERSION:
+            raise ValueError(f"레벨 뱅크 파일이 아닙니다: {self.path}")
+        self.map_width, self.map_height, self.num_boxes = w, h, k
+        self.records = np.memmap(self.path, dtype=np.uint8, mode="r",
+                                 offset=BANK_HEADER.size, shape=(count, 1 + 2 * k))
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, i):
+        return decode_level(self.records[i].tolist(), self.map_width, self.num_boxes)
+
+    def sample(self, rng=random):
+        """무작위 레벨 하나"""
+        return self[rng.randrange(len(self))]
+
+    # pickle 시 배열 대신 경로만 넘기고 받는 쪽에서 다시 매핑 (멀티프로세스 환경용)
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+
+def _generate_chunk(args):
+    seed, count, map_width, map_height, num_boxes = args
+    rng = random.Random(seed)
+    return [generate_reverse_play_level(map_width, map_height, num_boxes, rng=rng) for _ in range(count)]
+
+
+def _iter_generated_levels(count, seed, workers, map_width, map_height, num_boxes, chunk_size=10000):
+    """레벨을 청크 단위로 (필요하면 여러 프로세스에서) 생성해 순서대로 내보냄"""
+    jobs = [(seed * 1_000_003 + i, min(chunk_size, count - start), map_width, map_height, num_boxes)
+            for i, start in enumerate(range(0, count, chunk_size))]
+    if workers > 1:
+        with mp.Pool(workers) as pool:
+            for chunk in pool.imap(_generate_chunk, jobs):
+                yield from chunk
+    else:
+        for job in jobs:
+            yield from _generate_chunk(job)
+
+
+# 단독 실행 시: 레벨 뱅크 생성/정보 출력
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="소코반 레벨 뱅크 도구")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="역재생으로 레벨을 생성해 뱅크 파일로 저장")
+    build.add_argument("output")
+    build.add_argument("--count", type=int, default=1_000_000)
+    build.add_argument("--seed", type=int, default=0)
+    build.add_argument("--workers", type=int, default=1)
+    build.add_argument("--width", type=int, default=6)
+    build.add_argument("--height", type=int, default=6)
+    build.add_argument("--boxes", type=int, default=2)
+
+    info = sub.add_parser("info", help="뱅크 파일 정보 출력")
+    info.add_argument("bank")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        levels = _iter_generated_levels(args.count, args.seed, args.workers,
+                                        args.width, args.height, args.boxes)
+        n = write_level_bank(args.output, levels, args.width, args.height, args.boxes)
+        print(f"✅ {n}개 레벨 저장: {args.output} ({time.perf_counter() - start:.1f}s)")
+    else:
+        bank = LevelBank(args.bank)
+        print(f"{args.bank}: {len(bank)}개 레벨, {bank.map_width}x{bank.map_height}, 박스 {bank.num_boxes}개")
+        print(bank[0])
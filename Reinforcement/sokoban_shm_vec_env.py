@@ -0,0 +1,241 @@
+import multiprocessing as mp
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+from stable_baselines3.common.env_util import is_wrapped
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+from sokoban_env import SokobanEnv
+
+
+def _buffer_specs(num_envs, obs_shape):
+    """공유 메모리에 둘 버퍼 이름 → (shape, dtype)"""
+    return {
+        "obs": ((num_envs, *obs_shape), np.uint8),
+        "terminal_obs": ((num_envs, *obs_shape), np.uint8),
+        "rewards": ((num_envs,), np.float32),
+        "terminated": ((num_envs,), np.bool_),
+        "truncated": ((num_envs,), np.bool_),
+        "actions": ((num_envs,), np.int64),
+    }
+
+
+def _attach_buffers(shm_names, specs):
+    """이미 만들어진 공유 메모리 블록에 붙어서 NumPy 배열 뷰를 만든다 (워커 쪽)"""
+    blocks, arrays = [], {}
+    for key, (shape, dtype) in specs.items():
+        # 워커는 부모와 같은 resource_tracker를 공유하므로 해제(unlink)는 부모가 맡는다
+        shm = shared_memory.SharedMemory(name=shm_names[key])
+        blocks.append(shm)
+        arrays[key] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    return blocks, arrays
+
+
+def _worker(remote, parent_remote, lo, hi, shm_names, specs, engine, level_bank):
+    """envs[lo:hi]를 담당하는 워커. 관찰/보상/종료 플래그는 공유 메모리에 직접 쓴다."""
+    parent_remote.close()
+    blocks, buf = _attach_buffers(shm_names, specs)
+    envs = [SokobanEnv(engine=engine, level_bank=level_bank) for _ in range(lo, hi)]
+    try:
+        while True:
+            cmd, data = remote.recv()
+            if cmd == "step":
+                for i, env in enumerate(envs, lo):
+                    obs, reward, terminated, truncated, _ = env.step(int(buf["actions"][i]))
+                    buf["rewards"][i] = reward
+                    buf["terminated"][i] = terminated
+                    buf["truncated"][i] = truncated
+                    if terminated or truncated:
+                        buf["terminal_obs"][i] = obs
+                        obs, _ = env.reset()
+                    buf["obs"][i] = obs
+                remote.send(None)
+            elif cmd == "reset":
+                for i, env in enumerate(envs, lo):
+                    buf["obs"][i], _ = env.reset(seed=data[i - lo])
+                remote.send(None)
+            elif cmd == "get_attr":
+                indices, name = data
+                remote.send([getattr(envs[i], name) for i in indices])
+            elif cmd == "set_attr":
+                indices, name, value = data
+                for i in indices:
+                    setattr(envs[i], name, value)
+                remote.send(None)
+            elif cmd == "env_method":
+                indices, name, args, kwargs = data
+                remote.send([getattr(envs[i], name)(*args, **kwargs) for i in indices])
+            elif cmd == "is_wrapped":
+                indices, wrapper_class = data
+                remote.send([is_wrapped(envs[i], wrapper_class) for i in indices])
+            elif cmd == "close":
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for env in envs:
+            env.close()
+        del buf
+        for shm in blocks:
+            shm.close()
+        remote.close()
+
+
+class SokobanShmVecEnv(VecEnv):
+    """
+    SokobanEnv 전용 멀티프로세스 VecEnv
+
+    SubprocVecEnv는 매 스텝 관찰/보상을 pickle해서 파이프로 주고받지만,
+    여기서는 관찰/보상/종료 버퍼를 multiprocessing.shared_memory에 두고
+    각 워커가 담당 구간(envs[lo:hi])에 직접 씁니다. 파이프로는 짧은 명령과 완료 신호만 오갑니다.
+
+    num_envs: 전체 환경 수
+    n_workers: 워커 프로세스 수 (None이면 CPU 코어 수 * workers_per_core, 최대 num_envs)
+    workers_per_core: 코어당 워커 수
+    engine: SokobanGame 상태 엔진 ("set" 또는 "array")
+    level_bank: sokoban_levels.LevelBank (워커에는 경로만 전달되어 각자 메모리 매핑)
+    """
+
+    def __init__(self, num_envs, n_workers=None, workers_per_core=1, engine="array", level_bank=None,
+                 start_method=None):
+        if n_workers is None:
+            n_workers = int((os.cpu_count() or 1) * workers_per_core)
+        n_workers = max(1, min(n_workers, num_envs))
+        self.n_workers = n_workers
+        self.closed = False
+
+        probe = SokobanEnv(engine=engine, level_bank=level_bank)
+        observation_space, action_space = probe.observation_space, probe.action_space
+        self.render_mode = probe.render_mode
+        probe.close()
+
+        # 공유 버퍼 생성 (소유자는 부모 프로세스)
+        specs = _buffer_specs(num_envs, observation_space.shape)
+        self._shm_blocks = []
+        self._buf = {}
+        for key, (shape, dtype) in specs.items():
+            nbytes = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._shm_blocks.append(shm)
+            self._buf[key] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        shm_names = {key: shm.name for key, shm in zip(specs, self._shm_blocks)}
+
+        # 환경을 워커 수만큼 연속 구간으로 나눔
+        bounds = np.linspace(0, num_envs, n_workers + 1).astype(int)
+        self._slices = list(zip(bounds[:-1], bounds[1:]))
+
+        if start_method is None:
+            # fork가 가능하면 fork (워커 시작이 빠름), 아니면 spawn
+            start_method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+
+        self.remotes, self.processes = [], []
+        for lo, hi in self._slices:
+            remote, work_remote = ctx.Pipe()
+            args = (work_remote, remote, int(lo), int(hi), shm_names, specs, engine, level_bank)
+            process = ctx.Process(target=_worker, args=args, daemon=True)
+            process.start()
+            work_remote.close()
+            self.remotes.append(remote)
+            self.processes.append(process)
+
+        super().__init__(num_envs, observation_space, action_space)
+
+    # ---- VecEnv API ----
+    def reset(self):
+        for remote, (lo, hi) in zip(self.remotes, self._slices):
+            remote.send(("reset", self._seeds[lo:hi]))
+        for remote in self.remotes:
+            remote.recv()
+        self._reset_seeds()
+        self._reset_options()
+        return self._buf["obs"].copy()
+
+    def step_async(self, actions):
+        self._buf["actions"][:] = np.asarray(actions).reshape(self.num_envs)
+        for remote in self.remotes:
+            remote.send(("step", None))
+
+    def step_wait(self):
+        for remote in self.remotes:
+            remote.recv()
+
+        terminated = self._buf["terminated"]
+        truncated = self._buf["truncated"]
+        dones = terminated | truncated
+        infos = [{} for _ in range(self.num_envs)]
+        for i in np.nonzero(dones)[0]:
+            infos[i]["terminal_observation"] = self._buf["terminal_obs"][i].copy()
+            infos[i]["TimeLimit.truncated"] = bool(truncated[i] and not terminated[i])
+        return self._buf["obs"].copy(), self._buf["rewards"].copy(), dones, infos
+
+    def close(self):
+        if self.closed:
+            return
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for process in self.processes:
+            process.join()
+        self._buf.clear()
+        for shm in self._shm_blocks:
+            shm.close()
+            shm.unlink()
+        self.closed = True
+
+    def _dispatch(self, cmd, indices, *args):
+        """전역 인덱스를 워커별 지역 인덱스로 나눠 명령을 보내고 결과를 순서대로 모은다"""
+        indices = self._get_indices(indices)
+        targets = []
+        for remote, (lo, hi) in zip(self.remotes, self._slices):
+            local = [i - lo for i in indices if lo <= i < hi]
+            if local:
+                remote.send((cmd, (local, *args)))
+                targets.append(remote)
+        results = []
+        for remote in targets:
+            result = remote.recv()
+            if result is not None:
+                results.extend(result)
+        return results
+
+    def get_attr(self, attr_name, indices=None):
+        return self._dispatch("get_attr", indices, attr_name)
+
+    def set_attr(self, attr_name, value, indices=None):
+        self._dispatch("set_attr", indices, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        return self._dispatch("env_method", indices, method_name, method_args, method_kwargs)
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return self._dispatch("is_wrapped", indices, wrapper_class)
+
+
+# 단독 실행 시: 워커 수를 1부터 전체 코어까지 늘려가며 초당 스텝 수 측정
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="SokobanShmVecEnv 스케일링 벤치마크")
+    parser.add_argument("--num-envs", type=int, default=64)
+    parser.add_argument("--steps", type=int, default=2000, help="벡터 스텝 수")
+    parser.add_argument("--workers-per-core", type=int, default=1)
+    args = parser.parse_args()
+
+    max_workers = (os.cpu_count() or 1) * args.workers_per_core
+    worker_counts = sorted({1, *range(2, max_workers + 1, 2), max_workers})
+
+    print(f"num_envs={args.num_envs}, steps={args.steps}, cores={os.cpu_count()}")
+    baseline = None
+    for n_workers in worker_counts:
+        env = SokobanShmVecEnv(args.num_envs, n_workers=n_workers)
+        env.reset()
+        actions = np.random.randint(0, 4, size=(args.steps, args.num_envs))
+        start = time.perf_counter()
+        for a in actions:
+            env.step(a)
+        sps = args.steps * args.num_envs / (time.perf_counter() - start)
+        env.close()
+        baseline = baseline or sps
+        print(f"workers={n_workers:3d}  {sps:10.0f} steps/s  (x{sps / baseline:.2f})")
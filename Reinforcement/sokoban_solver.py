@@ -0,0 +1,317 @@
+"""
+소코반 솔버 (A* + 교착 상태 가지치기 + 전치 테이블)
+
+SokobanGame과 같은 규칙(바깥 테두리만 벽, 상하좌우 이동, 박스 1개씩 밀기)의 레벨을 푼다.
+
+- 탐색 단위는 "밀기": 플레이어가 걸어서 갈 수 있는 칸은 BFS로 한꺼번에 처리
+- Zobrist 해시로 상태를 64비트 정수로 만들고 전치 테이블(dict)에 최소 비용을 기록
+- 교착 가지치기: 어떤 목표로도 밀어 갈 수 없는 칸(구석 등)에 박스를 두는 밀기,
+  2x2 블록(벽/박스)에 목표 밖 박스가 얼어붙는 밀기
+- metric="pushes"면 플레이어 위치를 도달 가능 영역의 최소 칸으로 정규화해 상태 수를 줄이고,
+  metric="moves"면 정확한 플레이어 위치를 유지해 이동 수 기준 최적해를 찾는다
+
+사용 예:
+    actions = solve_game(game)                     # SokobanGame.step()에 넣을 액션 리스트 (없으면 None)
+    python sokoban_solver.py levels.bin --limit 1000
+"""
+
+import heapq
+import random
+from functools import lru_cache
+
+from sokoban_game import MOVE_MAP, build_neighbor_table
+
+INF = float("inf")
+
+
+@lru_cache(maxsize=None)
+def _zobrist_tables(n_cells, seed=0x50C0BA4):
+    """칸별 (박스, 플레이어) 64비트 난수표"""
+    rng = random.Random(seed)
+    boxes = tuple(rng.getrandbits(64) for _ in range(n_cells))
+    players = tuple(rng.getrandbits(64) for _ in range(n_cells))
+    return boxes, players
+
+
+class SokobanSolver:
+    """목표 배치가 같은 레벨에 대해 재사용할 수 있는 솔버"""
+
+    def __init__(self, map_width, map_height, targets):
+        self.map_width = map_width
+        self.map_height = map_height
+        self.n_cells = map_width * map_height
+        self.neighbors = build_neighbor_table(map_width, map_height)
+        self.targets = frozenset(self._idx(p) for p in targets)
+        self.zobrist_box, self.zobrist_player = _zobrist_tables(self.n_cells)
+        self.push_dist = self._compute_push_distances()
+        self.stats = {}
+
+    def _idx(self, pos):
+        return pos[1] * self.map_width + pos[0]
+
+    # ---- 전처리 ----
+    def _compute_push_distances(self):
+        """
+        칸별로 (다른 박스가 없다고 할 때) 가장 가까운 목표까지 필요한 최소 밀기 횟수.
+        목표에서 거꾸로 "끌기" BFS를 해서 구하며, 도달할 수 없는 칸(INF)은 교착 칸이다.
+        """
+        dist = [INF] * self.n_cells
+        queue = list(self.targets)
+        for t in queue:
+            dist[t] = 0
+        for cell in queue:
+            for action in range(len(MOVE_MAP)):
+                # cell의 박스를 prev로 끌어오려면 플레이어가 prev 너머 칸으로 물러날 수 있어야 함
+                prev = self.neighbors[cell][action]
+                if prev < 0 or dist[prev] != INF:
+                    continue
+                if self.neighbors[prev][action] < 0:
+                    continue
+                dist[prev] = dist[cell] + 1
+                queue.append(prev)
+        return dist
+
+    # ---- 탐색 보조 ----
+    def _reachable(self, player, boxes):
+        """플레이어가 박스를 밀지 않고 갈 수 있는 칸 → 걸음 수"""
+        dist = {player: 0}
+        queue = [player]
+        for cell in queue:
+            d = dist[cell] + 1
+            for n in self.neighbors[cell]:
+                if n >= 0 and n not in dist and n not in boxes:
+                    dist[n] = d
+                    queue.append(n)
+        return dist
+
+    def _heuristic(self, boxes):
+        return sum(self.push_dist[b] for b in boxes)
+
+    def _is_frozen(self, box, boxes):
+        """box를 포함하는 2x2 블록이 벽/박스로 꽉 차 있고 그중 목표 밖 박스가 있으면 교착"""
+        w, h = self.map_width, self.map_height
+        bx, by = box % w, box // w
+        for x0 in (bx - 1, bx):
+            for y0 in (by - 1, by):
+                blocked, off_target = True, False
+                for x, y in ((x0, y0), (x0 + 1, y0), (x0, y0 + 1), (x0 + 1, y0 + 1)):
+                    if not (0 <= x < w and 0 <= y < h):
+                        continue
+                    cell = y * w + x
+                    if cell not in boxes:
+                        blocked = False
+                        break
+                    if cell not in self.targets:
+                        off_target = True
+                if blocked and off_target:
+                    return True
+        return False
+
+    # ---- 탐색 ----
+    def solve(self, player, boxes, metric="moves", max_nodes=200_000):
+        """
+        player: (x, y), boxes: (x, y) 이터러블
+        반환값: 액션(0: 위, 1: 아래, 2: 왼쪽, 3: 오른쪽) 리스트, 풀 수 없거나 max_nodes 초과 시 None.
+        결과 상태는 self.stats["status"]에 "solved" / "unsolvable" / "limit"으로 기록된다.
+        """
+        if metric not in ("moves", "pushes"):
+            raise ValueError(f"metric은 'moves' 또는 'pushes'여야 합니다: {metric!r}")
+        start_player = self._idx(player)
+        start_boxes = frozenset(self._idx(p) for p in boxes)
+        self.stats = {"status": "unsolvable", "expanded": 0, "generated": 1}
+
+        h0 = self._heuristic(start_boxes)
+        if h0 == INF:
+            return None
+
+        zb, zp = self.zobrist_box, self.zobrist_player
+        normalize = metric == "pushes"
+
+        def key_of(p, box_hash, reach):
+            return box_hash ^ zp[min(reach) if normalize else p]
+
+        box_hash = 0
+        for b in start_boxes:
+            box_hash ^= zb[b]
+        reach = self._reachable(start_player, start_boxes)
+        start_key = key_of(start_player, box_hash, reach)
+
+        # 전치 테이블: 상태 키 → (최소 비용 g, 부모 키, 밀기 (박스 칸, 액션))
+        table = {start_key: (0, None, None)}
+        counter = 0
+        heap = [(h0, 0, counter, start_key, start_player, start_boxes, box_hash, reach)]
+
+        while heap:
+            f, g, _, key, p, bxs, bhash, reach = heapq.heappop(heap)
+            if table[key][0] < g:
+                continue  # 더 싸게 도달한 적이 있는 상태
+            if bxs == self.targets:
+                self.stats["status"] = "solved"
+                self.stats["cost"] = g
+                return self._reconstruct(table, key, start_player, start_boxes)
+            self.stats["expanded"] += 1
+            if self.stats["expanded"] > max_nodes:
+                self.stats["status"] = "limit"
+                return None
+
+            if reach is None:
+                reach = self._reachable(p, bxs)
+            for b in bxs:
+                for action in range(len(MOVE_MAP)):
+                    dst = self.neighbors[b][action]
+                    if dst < 0 or dst in bxs or self.push_dist[dst] == INF:
+                        continue
+                    # 밀려면 플레이어가 박스 반대편(src)에 설 수 있어야 함
+                    src = self.neighbors[b][action ^ 1]
+                    if src < 0 or src not in reach:
+                        continue
+                    new_boxes = (bxs - {b}) | {dst}
+                    if self._is_frozen(dst, new_boxes):
+                        continue
+
+                    new_g = g + (reach[src] + 1 if not normalize else 1)
+                    new_hash = bhash ^ zb[b] ^ zb[dst]
+                    new_reach = self._reachable(b, new_boxes) if normalize else None
+                    new_key = key_of(b, new_hash, new_reach)
+                    known = table.get(new_key)
+                    if known is not None and known[0] <= new_g:
+                        continue
+                    table[new_key] = (new_g, key, (b, action))
+                    counter += 1
+                    self.stats["generated"] += 1
+                    h = self._heuristic(new_boxes)
+                    heapq.heappush(heap, (new_g + h, new_g, counter, new_key, b, new_boxes, new_hash, new_reach))
+        return None
+
+    def _reconstruct(self, table, key, start_player, start_boxes):
+        """전치 테이블의 부모 링크로 밀기 순서를 복원하고, 밀기 사이의 걸음을 BFS로 채움"""
+        pushes = []
+        while table[key][1] is not None:
+            _, parent, push = table[key]
+            pushes.append(push)
+            key = parent
+        pushes.reverse()
+
+        actions = []
+        player, boxes = start_player, set(start_boxes)
+        for box, action in pushes:
+            src = self.neighbors[box][action ^ 1]
+            actions.extend(self._walk(player, src, boxes))
+            actions.append(action)
+            boxes.remove(box)
+            boxes.add(self.neighbors[box][action])
+            player = box
+        return actions
+
+    def _walk(self, start, goal, boxes):
+        """start → goal 최단 걸음 (박스를 밀지 않음)"""
+        parent = {start: None}
+        queue = [start]
+        for cell in queue:
+            if cell == goal:
+                break
+            for action, n in enumerate(self.neighbors[cell]):
+                if n >= 0 and n not in parent and n not in boxes:
+                    parent[n] = (cell, action)
+                    queue.append(n)
+        path = []
+        cell = goal
+        while parent[cell] is not None:
+            cell, action = parent[cell]
+            path.append(action)
+        path.reverse()
+        return path
+
+
+def solve_level(level_data, map_width=6, map_height=6, metric="moves", max_nodes=200_000):
+    """레벨 dict({"player", "boxes", "targets"})를 풀어 (액션 리스트 또는 None, 통계) 반환"""
+    solver = SokobanSolver(map_width, map_height, level_data["targets"])
+    actions = solver.solve(level_data["player"], level_data["boxes"], metric=metric, max_nodes=max_nodes)
+    return actions, solver.stats
+
+
+def solve_game(game, metric="moves", max_nodes=200_000):
+    """SokobanGame의 현재 상태를 풀어 액션 리스트 반환 (풀 수 없으면 None)"""
+    level_data = {"player": game.player_pos, "boxes": game.box_positions, "targets": game.target_positions}
+    actions, _ = solve_level(level_data, game.map_width, game.map_height, metric, max_nodes)
+    return actions
+
+
+def _load_levels(path):
+    """레벨 뱅크(.bin) 또는 JSON Lines({"player": [x, y], "boxes": [[x, y], ...], "targets": [...]}) 파일"""
+    import json
+    from sokoban_levels import BANK_MAGIC, LevelBank
+
+    with open(path, "rb") as f:
+        is_bank = f.read(len(BANK_MAGIC)) == BANK_MAGIC
+    if is_bank:
+        bank = LevelBank(path)
+        return bank.map_width, bank.map_height, (bank[i] for i in range(len(bank))), len(bank)
+
+    levels = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                d = json.loads(line)
+                levels.append({
+                    "player": tuple(d["player"]),
+                    "boxes": {tuple(p) for p in d["boxes"]},
+                    "targets": {tuple(p) for p in d["targets"]},
+                })
+    width = max(p[0] for lv in levels for p in (lv["player"], *lv["boxes"], *lv["targets"])) + 1
+    height = max(p[1] for lv in levels for p in (lv["player"], *lv["boxes"], *lv["targets"])) + 1
+    return width, height, iter(levels), len(levels)
+
+
+# 단독 실행 시: 레벨 파일 일괄 풀이
+if __name__ == '__main__':
+    import argparse
+    import csv
+    import time
+
+    parser = argparse.ArgumentParser(description="소코반 레벨 파일 일괄 풀이")
+    parser.add_argument("levels", help="레벨 뱅크(.bin) 또는 JSON Lines 파일")
+    parser.add_argument("--limit", type=int, default=None, help="앞에서부터 풀 레벨 수")
+    parser.add_argument("--metric", choices=("moves", "pushes"), default="moves")
+    parser.add_argument("--max-nodes", type=int, default=200_000)
+    parser.add_argument("--width", type=int, default=None, help="JSON Lines 파일의 맵 폭 (기본: 좌표에서 추정)")
+    parser.add_argument("--height", type=int, default=None)
+    parser.add_argument("--csv", default=None, help="레벨별 결과를 저장할 CSV 경로")
+    args = parser.parse_args()
+
+    width, height, levels, total = _load_levels(args.levels)
+    width, height = args.width or width, args.height or height
+    total = min(total, args.limit) if args.limit else total
+
+    writer = None
+    if args.csv:
+        out = open(args.csv, "w", newline="", encoding="utf-8")
+        writer = csv.writer(out)
+        writer.writerow(["index", "status", "length", "expanded", "seconds", "solution"])
+
+    counts = {"solved": 0, "unsolvable": 0, "limit": 0}
+    lengths = []
+    start = time.perf_counter()
+    for i, level in enumerate(levels):
+        if i >= total:
+            break
+        t0 = time.perf_counter()
+        actions, stats = solve_level(level, width, height, args.metric, args.max_nodes)
+        elapsed = time.perf_counter() - t0
+        counts[stats["status"]] += 1
+        if actions is not None:
+            lengths.append(len(actions))
+        if writer:
+            writer.writerow([i, stats["status"], len(actions) if actions is not None else "",
+                             stats["expanded"], f"{elapsed:.6f}",
+                             "".join("UDLR"[a] for a in actions) if actions is not None else ""])
+
+    elapsed = time.perf_counter() - start
+    if writer:
+        out.close()
+
+    print(f"{total}개 레벨 ({width}x{height}, metric={args.metric}): "
+          f"풀이 {counts['solved']}, 풀 수 없음 {counts['unsolvable']}, 노드 한도 초과 {counts['limit']}")
+    if lengths:
+        print(f"해답 길이: 평균 {sum(lengths) / len(lengths):.2f}, 최소 {min(lengths)}, 최대 {max(lengths)}")
+    print(f"레벨당 평균 {elapsed / max(total, 1) * 1e6:.0f}µs")
@@ -5,12 +5,23 @@ from gymnasium import spaces
 
 from stable_baselines3 import PPO
 from stable_baselines3.common.monitor import Monitor
-from stable_baselines3.common.vec_env import DummyVecEnv
+from stable_baselines3.common.vec_env import DummyVecEnv, VecMonitor
 from stable_baselines3.common.torch_layers import BaseFeaturesExtractor
 from stable_baselines3.common.callbacks import CheckpointCallback
 
 from rnd_wrapper import RNDRewardWrapper 
 from sokoban_env import SokobanEnv
+from sokoban_vec_env import SokobanVecEnv
+from sokoban_levels import LevelBank
+
+# True면 N_ENVS개의 보드를 한 번의 step 호출로 진행하는 SokobanVecEnv를 사용
+# (env마다 gym.Wrapper를 씌우려면 False로 두고 make_env를 사용하세요)
+USE_BATCHED_ENV = True
+N_ENVS = 16
+
+# 미리 생성한 레벨 뱅크 경로 (None이면 매 리셋마다 무작위 생성)
+# 생성: python sokoban_levels.py build levels.bin --count 1000000
+LEVEL_BANK_PATH = None
 
 # CNN 만들어보기
 class CustomCNN(BaseFeaturesExtractor):
@@ -18,9 +29,9 @@ class CustomCNN(BaseFeaturesExtractor):
 
 
 # 환경 생성을 위한 헬퍼 함수
-def make_env(log_dir):
+def make_env(log_dir, level_bank=None):
     def _init():
-        env = SokobanEnv()
+        env = SokobanEnv(level_bank=level_bank)
         # RND로 감싸기
 
         env = Monitor(env, log_dir)
@@ -36,7 +47,11 @@ if __name__ == '__main__':
     os.makedirs(tensorboard_log_dir, exist_ok=True)
     os.makedirs(model_save_path, exist_ok=True)
 
-    env = DummyVecEnv([make_env(log_dir)])
+    level_bank = LevelBank(LEVEL_BANK_PATH) if LEVEL_BANK_PATH else None
+    if USE_BATCHED_ENV:
+        env = VecMonitor(SokobanVecEnv(N_ENVS, level_bank=level_bank), log_dir)
+    else:
+        env = DummyVecEnv([make_env(log_dir, level_bank)])
 
     policy_kwargs = dict(
         features_extractor_class=CustomCNN,
@@ -59,12 +74,13 @@ if __name__ == '__main__':
             env,
             tensorboard_log=tensorboard_log_dir,
             verbose=1,
+            n_steps=2048 // env.num_envs, # 롤아웃 한 번의 전체 스텝 수를 2048로 유지
             
             # 직접 하이퍼 파라미터를 지정해보자
         )
     
     checkpoint_callback = CheckpointCallback(
-        save_freq=50000,
+        save_freq=max(1, 50000 // env.num_envs), # save_freq는 VecEnv step 단위이므로 환경 수로 나눠 5만 타임스텝마다 저장
         save_path=model_save_path,
         name_prefix="sokoban_rnd_manual_model"
     )
@@ -0,0 +1,197 @@
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+from sokoban_env import MAX_EPISODE_STEPS
+from sokoban_game import (
+    CELL_BOX, CELL_TARGET, OBS_LUT,
+    STEP_PENALTY, BOX_ON_TARGET_REWARD, WIN_REWARD,
+    build_neighbor_table,
+)
+
+
+class SokobanVecEnv(VecEnv):
+    """
+    N개의 소코반 보드를 하나의 NumPy 배열 묶음으로 동시에 진행하는 VecEnv
+
+    DummyVecEnv([SokobanEnv] * N)과 같은 규칙(보상, 200스텝 truncation, 자동 리셋)을 따르지만
+    이동/밀기/승리 판정/리셋/관찰 생성이 모두 (N, H*W) 배열 연산으로 처리되므로
+    환경 수가 늘어나도 파이썬 호출 횟수는 그대로입니다.
+    level_bank(sokoban_levels.LevelBank)를 주면 리셋 때 뱅크의 레코드를 무작위로 꺼내 씁니다.
+    """
+
+    def __init__(self, num_envs, map_width=6, map_height=6, num_boxes=2, box_spawn_margin=1, seed=None,
+                 level_bank=None):
+        self.map_width = map_width
+        self.map_height = map_height
+        self.num_boxes = num_boxes
+        self.render_mode = None
+
+        self.level_bank = level_bank
+        if level_bank is not None and (level_bank.map_width, level_bank.map_height, level_bank.num_boxes) != (
+                map_width, map_height, num_boxes):
+            raise ValueError("레벨 뱅크의 맵 크기/박스 수가 환경 설정과 다릅니다.")
+
+        observation_space = spaces.Box(
+            low=0, high=4,
+            shape=(1, map_height, map_width),
+            dtype=np.uint8
+        )
+        super().__init__(num_envs, observation_space, spaces.Discrete(4))
+
+        n_cells = map_width * map_height
+        self._neighbors = np.array(build_neighbor_table(map_width, map_height), dtype=np.int64)
+        cols = np.arange(n_cells) % map_width
+        rows = np.arange(n_cells) // map_width
+        m = box_spawn_margin
+        # 박스 생성 가능 칸 (바깥 링 제외)
+        self._inner_mask = (cols >= m) & (cols < map_width - m) & (rows >= m) & (rows < map_height - m)
+
+        self._rows = np.arange(num_envs)
+        self._cells = np.zeros((num_envs, n_cells), dtype=np.uint8)
+        self._player = np.zeros(num_envs, dtype=np.int64)
+        self._on_target = np.zeros(num_envs, dtype=np.int64)
+        self._steps = np.zeros(num_envs, dtype=np.int64)
+        self._actions = np.zeros(num_envs, dtype=np.int64)
+        self._rng = np.random.default_rng(seed)
+
+    # ---- 레벨 생성 / 관찰 ----
+    def _reset_boards(self, idx):
+        """idx 위치의 보드들을 새 레벨로 한 번에 리셋"""
+        if self.level_bank is not None:
+            records = self.level_bank.records[self._rng.integers(0, len(self.level_bank), len(idx))]
+            player, boxes, targets = records[:, 0], records[:, 1:1 + self.num_boxes], records[:, 1 + self.num_boxes:]
+        else:
+            player, boxes, targets = self._random_levels(len(idx))
+
+        n = len(idx)
+        cells = np.zeros((n, self._cells.shape[1]), dtype=np.uint8)
+        np.put_along_axis(cells, boxes.astype(np.int64), CELL_BOX, axis=1)
+        target_bits = np.zeros_like(cells)
+        np.put_along_axis(target_bits, targets.astype(np.int64), CELL_TARGET, axis=1)
+        cells |= target_bits
+
+        self._cells[idx] = cells
+        self._player[idx] = player
+        self._on_target[idx] = (cells == CELL_BOX | CELL_TARGET).sum(axis=1)
+        self._steps[idx] = 0
+
+    def _random_levels(self, n):
+        """n개의 무작위 레벨 (SokobanGame._generate_random_level_data와 같은 분포)"""
+        n_cells = self._cells.shape[1]
+        k = self.num_boxes
+
+        # 박스: 안쪽 칸 중 무작위 k개 (무작위 키를 정렬해 행마다 비복원 추출)
+        keys = self._rng.random((n, n_cells))
+        keys[:, ~self._inner_mask] = 2.0
+        boxes = np.argsort(keys, axis=1)[:, :k]
+
+        # 플레이어와 목표: 박스가 없는 칸 중 무작위 (서로 겹치지 않음)
+        keys = self._rng.random((n, n_cells))
+        np.put_along_axis(keys, boxes, 2.0, axis=1)
+        order = np.argsort(keys, axis=1)
+        return order[:, 0], boxes, order[:, 1:k + 1]
+
+    def _observe(self):
+        """(N, 1, H, W) uint8 관찰 텐서"""
+        obs = OBS_LUT[self._cells]
+        obs[self._rows, self._player] = 1
+        return obs.reshape(self.num_envs, 1, self.map_height, self.map_width)
+
+    # ---- VecEnv API ----
+    def reset(self):
+        seeds = [s for s in self._seeds if s is not None]
+        if seeds:
+            self._rng = np.random.default_rng(seeds[0])
+        self._reset_seeds()
+        self._reset_options()
+        self._reset_boards(self._rows)
+        return self._observe()
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+    def step_wait(self):
+        rows, cells, player = self._rows, self._cells, self._player
+        actions = self._actions
+
+        # 1. 이동할 칸 (맵 밖이면 -1)
+        nxt = self._neighbors[player, actions]
+        in_map = nxt >= 0
+        nxt_safe = np.where(in_map, nxt, player)
+
+        # 2. 박스 밀기: 박스 너머 칸이 맵 안이고 비어 있어야 함
+        has_box = in_map & ((cells[rows, nxt_safe] & CELL_BOX) != 0)
+        beyond = self._neighbors[nxt_safe, actions]
+        beyond_safe = np.where(beyond >= 0, beyond, nxt_safe)
+        push = has_box & (beyond >= 0) & ((cells[rows, beyond_safe] & CELL_BOX) == 0)
+        moved = in_map & (~has_box | push)
+
+        before = self._on_target.copy()
+        p = np.nonzero(push)[0]
+        if len(p):
+            src, dst = nxt[p], beyond[p]
+            cells[p, src] ^= CELL_BOX
+            cells[p, dst] |= CELL_BOX
+            self._on_target[p] += (cells[p, dst] >> 1).astype(np.int64) - (cells[p, src] >> 1)
+        self._player = np.where(moved, nxt, player)
+
+        # 3. 보상과 종료 판정 (SokobanGame.step / SokobanEnv.step과 동일)
+        rewards = np.full(self.num_envs, STEP_PENALTY, dtype=np.float32)
+        rewards += BOX_ON_TARGET_REWARD * np.sign(self._on_target - before)
+        terminated = self._on_target == self.num_boxes
+        rewards[terminated] += WIN_REWARD
+
+        self._steps += 1
+        truncated = self._steps >= MAX_EPISODE_STEPS
+        dones = terminated | truncated
+
+        obs = self._observe()
+        infos = [{} for _ in range(self.num_envs)]
+
+        # 4. 끝난 보드만 모아서 한 번에 자동 리셋
+        done_idx = np.nonzero(dones)[0]
+        if len(done_idx):
+            for i in done_idx:
+                infos[i]["terminal_observation"] = obs[i].copy()
+                infos[i]["TimeLimit.truncated"] = bool(truncated[i] and not terminated[i])
+            self._reset_boards(done_idx)
+            obs = self._observe()
+
+        return obs, rewards, dones, infos
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        method = getattr(self, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
+
+
+# 단독 실행 시: DummyVecEnv(SokobanEnv x N)과 초당 스텝 수 비교
+if __name__ == '__main__':
+    import time
+    from stable_baselines3.common.vec_env import DummyVecEnv
+    from sokoban_env import SokobanEnv
+
+    def measure(env, n_steps):
+        env.reset()
+        actions = np.random.randint(0, 4, size=(n_steps, env.num_envs))
+        start = time.perf_counter()
+        for a in actions:
+            env.step(a)
+        return n_steps * env.num_envs / (time.perf_counter() - start)
+
+    for n in (1, 16, 256):
+        dummy = measure(DummyVecEnv([SokobanEnv for _ in range(n)]), 2000 // n + 20)
+        batched = measure(SokobanVecEnv(n), 200_000 // n)
+        print(f"N={n:4d}  DummyVecEnv: {dummy:10.0f} steps/s  SokobanVecEnv: {batched:10.0f} steps/s")
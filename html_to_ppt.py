@@ -1,130 +1,1054 @@
 """
 HTML 슬라이드를 PPT로 변환하는 스크립트
 각 슬라이드를 캡처하여 PowerPoint 파일로 생성합니다.
+
+여러 Playwright 페이지(브라우저 컨텍스트)가 슬라이드를 나눠서 동시에 캡처하고,
+고정 sleep 대신 실제 준비 신호(폰트 로드, KaTeX 렌더링, CSS 전환 종료)를 기다립니다.
+스크린샷은 임시 파일 없이 메모리에서 바로 PPT로 조립됩니다.
+
+사용 예:
+    python html_to_ppt.py                                   # Tractrix 덱 (슬라이드 수 자동 감지)
+    python html_to_ppt.py Teacher/InfoEdu/2025AISchool.html -o AISchool.pptx
+    python html_to_ppt.py --batch . -o ppt_export           # showSlide()를 쓰는 모든 덱 일괄 변환
 """
 
-from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 from pptx import Presentation
-from pptx.util import Inches
-from PIL import Image
+from pptx.dml.color import RGBColor
+from pptx.enum.shapes import MSO_SHAPE
+from pptx.enum.text import MSO_AUTO_SIZE, PP_ALIGN
+from pptx.util import Emu, Inches, Pt
+from PIL import Image, ImageChops, ImageStat
+from io import BytesIO
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from pathlib import Path
+import argparse
+import asyncio
+import hashlib
+import math
+import re
+import struct
 import time
 import os
-from pathlib import Path
 
-def capture_slides_to_ppt(html_path, output_ppt_path, total_slides=49):
+VIEWPORT = {'width': 1920, 'height': 1080}
+
+# 페이지 준비 완료 조건: load 완료 + 웹폰트 로드 + (KaTeX를 쓰는 문서라면) KaTeX 로드와 자동 렌더링 완료
+# (렌더링 완료 = .katex 요소가 생겼거나 본문에 렌더링 안 된 $$, \( 구분자가 남아 있지 않음)
+PAGE_READY_JS = r"""
+() => {
+    if (document.readyState !== 'complete' || document.fonts.status !== 'loaded') return false;
+    if (!document.querySelector('script[src*="katex"]')) return true;
+    if (!window.katex) return false;
+    if (document.querySelector('script[src*="auto-render"]') && !window.renderMathInElement) return false;
+    return !!document.querySelector('.katex') || !/\$\$|\\\(/.test(document.body.innerText);
+}
+"""
+
+# 슬라이드 전환 후: 끝나는 애니메이션/CSS 전환이 모두 끝나고 한 프레임이 그려질 때까지 대기
+# (무한 반복 애니메이션은 끝나지 않으므로 제외, timeout_ms가 지나면 그대로 진행)
+SLIDE_SETTLED_JS = """
+async (timeoutMs) => {
+    const finite = document.getAnimations().filter(a => {
+        const t = a.effect && a.effect.getComputedTiming();
+        return t && Number.isFinite(t.endTime) && a.playState !== 'finished';
+    });
+    const timeout = new Promise(r => setTimeout(r, timeoutMs));
+    await Promise.race([Promise.all(finite.map(a => a.finished.catch(() => null))), timeout]);
+    await document.fonts.ready;
+    await new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)));
+    return finite.length;
+}
+"""
+
+# 슬라이드 캐시 키 재료: 슬라이드별 outerHTML(요소 자신의 class/style 포함)과 그 안의 이미지 주소,
+# 문서 전체의 CSS/JS 주소와 인라인 코드, 슬라이드를 뺀 나머지 DOM(진행 표시줄, 머리글 등)과 적용된 CSS 규칙
+DECK_FINGERPRINT_JS = """
+(selector) => {
+    const abs = u => new URL(u, document.baseURI).href;
+    const chrome = document.documentElement.cloneNode(true);
+    chrome.querySelectorAll(selector).forEach(el => el.replaceWith(document.createComment('slide')));
+    const styles = [...document.styleSheets].map(sheet => {
+        try {
+            return [...sheet.cssRules].map(r => r.cssText).join('\\n');
+        } catch (e) {  // 읽을 수 없는 외부 스타일시트는 주소(assets)로 대신함
+            return sheet.href || '';
+        }
+    });
+    return {
+        assets: [...document.querySelectorAll('link[rel="stylesheet"][href], script[src]')]
+            .map(e => abs(e.getAttribute('href') || e.getAttribute('src'))),
+        inline: [...document.querySelectorAll('style, script:not([src])')].map(e => e.textContent),
+        chrome: chrome.outerHTML,
+        styles,
+        slides: [...document.querySelectorAll(selector)].map(el => ({
+            html: el.outerHTML,
+            assets: [...el.querySelectorAll('img[src], video[poster], source[src]')]
+                .map(e => e.currentSrc || e.src || e.poster),
+        })),
+    };
+}
+"""
+
+# showSlide()가 켜고 끄는 슬라이드 요소를 후보 선택자 중에서 찾고, 번호 기준(0 또는 1부터)을 알아냄
+# showSlide(1), showSlide(2)를 호출해 'active'가 붙는 요소 인덱스가 i, i+1이면 그 선택자가 슬라이드
+DETECT_DECK_JS = """
+(selectors) => {
+    if (typeof showSlide !== 'function') return null;
+    for (const selector of selectors) {
+        const els = [...document.querySelectorAll(selector)];
+        if (els.length < 2) continue;
+        const activeIndex = () => els.findIndex(e => e.classList.contains('active'));
+        showSlide(1);
+        const first = activeIndex();
+        showSlide(2);
+        const second = activeIndex();
+        if (first < 0 || second !== first + 1) continue;
+        const offset = 1 - first;  // 요소 인덱스 i ↔ showSlide(i + offset)
+        showSlide(offset);
+        return {selector, count: els.length, offset};
+    }
+    return null;
+}
+"""
+
+SLIDE_SELECTORS = [".slide", ".slide-container", "section.slide", "[data-slide]", "section"]
+
+# 일괄 변환 대상: showSlide 함수를 정의한 HTML
+SHOW_SLIDE_RE = re.compile(r"function\s+showSlide\s*\(|\bshowSlide\s*=")
+
+CACHE_VERSION = 2
+
+
+class SlideCache:
     """
-    HTML 슬라이드를 캡처하여 PPT 파일로 생성
+    슬라이드 스크린샷 캐시 (디렉터리에 <키>.png로 저장)
 
-    Args:
-        html_path: HTML 파일 경로
-        output_ppt_path: 출력 PPT 파일 경로
-        total_slides: 총 슬라이드 수
+    키는 슬라이드 내용과 덱 자산의 해시이므로 바뀐 슬라이드만 다시 캡처하면 됩니다.
+    읽을 때마다 파일 시각을 갱신하고, 저장 후 max_age_days보다 오래 안 쓴 파일과
+    총 용량이 max_bytes를 넘는 만큼 가장 오래 안 쓴 파일부터 지웁니다.
     """
 
-    # 임시 이미지 저장 폴더
-    temp_folder = Path("temp_slides")
-    temp_folder.mkdir(exist_ok=True)
+    def __init__(self, root=".slide_cache", max_bytes=500 * 1024 * 1024, max_age_days=30):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
 
-    print(f"🚀 슬라이드 캡처 시작: {html_path}")
-    print(f"📊 총 {total_slides}개 슬라이드")
+    def _path(self, key):
+        return self.root / f"{key}.png"
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        os.utime(path)  # 최근 사용 시각 갱신 (LRU)
+        self.hits += 1
+        return data
+
+    def touch(self, key):
+        """키가 있으면 최근 사용 시각만 갱신하고 True (내용은 읽지 않음)"""
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def put(self, key, data):
+        # 다른 프로세스가 반쯤 쓴 파일을 읽지 않도록 임시 파일에 쓰고 교체
+        tmp = self._path(key).with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, self._path(key))
+
+    def evict(self):
+        """오래된 항목과 용량 초과분 삭제, 지운 파일 수를 반환"""
+        now = time.time()
+        entries = []
+        for path in self.root.glob("*.png"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()  # 오래 안 쓴 순
+
+        removed = 0
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age and total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+
+def _asset_digest(url, memo):
+    """로컬 파일(file://)은 내용 해시, 원격 주소는 주소 자체(버전이 붙은 CDN 주소)를 지문으로 사용"""
+    if url not in memo:
+        parsed = urlparse(url)
+        if parsed.scheme == "file":
+            try:
+                memo[url] = hashlib.sha1(Path(url2pathname(parsed.path)).read_bytes()).hexdigest()
+            except OSError:
+                memo[url] = "missing"
+        else:
+            memo[url] = url
+    return memo[url]
+
+
+async def slide_cache_keys(page, total_slides, slide_selector=".slide"):
+    """
+    슬라이드 번호(1부터) → 캐시 키 리스트
+
+    덱 전체 지문(CSS/JS 파일 내용, 인라인 스타일/스크립트, 적용된 CSS 규칙, 슬라이드 밖 DOM, 뷰포트)과
+    슬라이드별 outerHTML 및 슬라이드 안 이미지 파일 내용을 해시합니다. 슬라이드 요소 수가 total_slides와 다르면
+    번호와 요소를 짝지을 수 없으므로 None(캐시 사용 안 함)을 반환합니다.
+    """
+    fp = await page.evaluate(DECK_FINGERPRINT_JS, slide_selector)
+    if len(fp["slides"]) != total_slides:
+        return None
+
+    memo = {}
+    deck = hashlib.sha1()
+    deck.update(f"v{CACHE_VERSION} {VIEWPORT['width']}x{VIEWPORT['height']}".encode())
+    for url in fp["assets"]:
+        deck.update(_asset_digest(url, memo).encode())
+    for code in fp["inline"] + fp["styles"] + [fp["chrome"]]:
+        deck.update(code.encode())
+
+    keys = []
+    for slide in fp["slides"]:
+        h = deck.copy()
+        h.update(slide["html"].encode())
+        for url in slide["assets"]:
+            h.update(_asset_digest(url, memo).encode())
+        keys.append(h.hexdigest())
+    return keys
+
+
+async def _open_deck(browser, file_url, ready_timeout_ms):
+    """새 컨텍스트/페이지로 덱을 열고 준비 신호를 기다림"""
+    context = await browser.new_context(viewport=VIEWPORT)
+    page = await context.new_page()
+    await page.goto(file_url, wait_until="load")
+    try:
+        await page.wait_for_function(PAGE_READY_JS, polling=50, timeout=ready_timeout_ms)
+    except PlaywrightTimeoutError:  # CDN 차단 등으로 KaTeX가 끝내 안 오면 그대로 캡처
+        print("⚠️ 준비 신호 대기 시간 초과, 그대로 진행합니다.")
+    return context, page
+
+
+async def detect_deck(page):
+    """열린 덱에서 슬라이드 선택자/개수/showSlide 번호 기준을 찾음 (못 찾으면 None)"""
+    return await page.evaluate(DETECT_DECK_JS, SLIDE_SELECTORS)
+
+
+async def _screenshot_slide(page, slide_num):
+    # 스크린샷은 파일 대신 메모리로
+    return await page.screenshot(full_page=False)
 
-    # Playwright로 브라우저 실행 및 캡처
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page(viewport={'width': 1920, 'height': 1080})
 
-        # HTML 파일 열기
-        file_url = f"file://{os.path.abspath(html_path).replace(os.sep,'/')}"
-        page.goto(file_url)
+class _ClaimWindow:
+    """
+    캡처할 슬라이드 번호를 앞에서부터 하나씩 나눠 주되, 조립 차례(next_num)에서
+    window칸 앞까지만 나눠 줌
+
+    한 슬라이드가 오래 걸려도 다른 워커가 window 밖의 슬라이드를 미리 캡처하지 않으므로
+    조립 쪽 reorder 버퍼에는 많아야 window개만 쌓입니다. 다음 차례 번호는 항상
+    window 안에 있으므로 캡처가 멈추지 않습니다.
+    """
 
-        # KaTeX 수식 렌더링 대기
-        time.sleep(2)
+    def __init__(self, slide_nums, window):
+        self._nums = sorted(slide_nums)
+        self._index = 0
+        self.window = max(1, window)
+        self.next_num = 1
+        self._changed = asyncio.Condition()
 
-        # 각 슬라이드 캡처
-        screenshot_paths = []
+    async def claim(self):
+        """다음 번호 (window 밖이면 차례가 올 때까지 대기), 남은 번호가 없으면 None"""
+        async with self._changed:
+            while self._index < len(self._nums) and self._nums[self._index] >= self.next_num + self.window:
+                await self._changed.wait()
+            if self._index >= len(self._nums):
+                return None
+            self._index += 1
+            return self._nums[self._index - 1]
 
-        for slide_num in range(1, total_slides + 1):
+    async def advance(self, next_num):
+        async with self._changed:
+            self.next_num = next_num
+            self._changed.notify_all()
+
+
+async def _capture_worker(browser, file_url, claims, queue, total_slides, offset,
+                          ready_timeout_ms, transition_timeout_ms, opened=None, on_captured=None, slot=None,
+                          capture=_screenshot_slide):
+    """
+    claims(_ClaimWindow)에서 번호를 하나씩 받아 한 페이지에서 캡처하고 (번호, 캡처 결과)를 큐에 넣음
+
+    claims를 여러 워커가 공유하면, 남은 번호 중 가장 앞선 것을 비어 있는 페이지가
+    가져가므로 슬라이드가 거의 순서대로 도착합니다.
+    offset: 슬라이드 번호 n(1부터) ↔ showSlide(n - 1 + offset)
+    opened: 이미 열어 둔 (context, page)가 있으면 재사용
+    on_captured: 캡처할 때마다 (번호, PNG 바이트)로 호출 (캐시 저장용)
+    slot: 동시 페이지 수 제한용 세마포어 (opened가 있으면 이미 획득한 상태로 간주, 끝나면 반납)
+    capture: (page, 번호) → 캡처 결과 코루틴 (기본: 화면 PNG 바이트)
+    """
+    if opened is None and slot is not None:
+        await slot.acquire()
+    try:
+        context, page = opened or await _open_deck(browser, file_url, ready_timeout_ms)
+    except BaseException:
+        if slot is not None:
+            slot.release()
+        raise
+    try:
+        while True:
+            slide_num = await claims.claim()
+            if slide_num is None:
+                break
             print(f"📸 슬라이드 {slide_num}/{total_slides} 캡처 중...")
 
-            # 슬라이드로 이동
-            page.evaluate(f"showSlide({slide_num})")
+            # 슬라이드로 이동 후 전환 애니메이션 완료 대기
+            await page.evaluate(f"showSlide({slide_num - 1 + offset})")
+            await page.evaluate(SLIDE_SETTLED_JS, transition_timeout_ms)
 
-            # 애니메이션 완료 대기
-            time.sleep(0.5)
+            result = await capture(page, slide_num)
+            if on_captured is not None:
+                on_captured(slide_num, result)
+            # 큐가 가득 차 있으면 조립이 따라올 때까지 대기
+            await queue.put((slide_num, result))
+    finally:
+        await context.close()
+        if slot is not None:
+            slot.release()
 
-            # 스크린샷 저장
-            screenshot_path = temp_folder / f"slide_{slide_num:03d}.png"
-            page.screenshot(path=str(screenshot_path), full_page=False)
-            screenshot_paths.append(screenshot_path)
 
-        browser.close()
+def png_size(data):
+    """PNG 바이트의 IHDR 청크에서 (너비, 높이)를 읽음 (디코딩 없이)"""
+    if data[:8] != b"\x89PNG\r\n\x1a\n" or data[12:16] != b"IHDR":
+        raise ValueError("PNG 데이터가 아닙니다.")
+    return struct.unpack(">II", data[16:24])
 
-    print("\n📦 PPT 파일 생성 중...")
 
-    # PowerPoint 프레젠테이션 생성
+def new_presentation():
+    """16:9 빈 프레젠테이션"""
     prs = Presentation()
     prs.slide_width = Inches(16)  # 16:9 비율
     prs.slide_height = Inches(9)
+    return prs
+
+
+def add_image_slide(prs, image_bytes, img_size):
+    """이미지 바이트를 비율을 유지한 채 가운데 정렬해 새 슬라이드로 추가"""
+    # 빈 슬라이드 추가
+    blank_slide_layout = prs.slide_layouts[6]  # 빈 레이아웃
+    slide = prs.slides.add_slide(blank_slide_layout)
+
+    img_width, img_height = img_size
+
+    # 슬라이드 크기에 맞게 조정
+    slide_width = prs.slide_width
+    slide_height = prs.slide_height
+
+    # 비율 유지하면서 슬라이드에 맞추기
+    img_ratio = img_width / img_height
+    slide_ratio = slide_width / slide_height
+
+    if img_ratio > slide_ratio:
+        # 이미지가 더 넓음 - 너비에 맞춤
+        pic_width = slide_width
+        pic_height = int(slide_width / img_ratio)
+    else:
+        # 이미지가 더 높음 - 높이에 맞춤
+        pic_height = slide_height
+        pic_width = int(slide_height * img_ratio)
+
+    # 중앙 정렬
+    left = (slide_width - pic_width) // 2
+    top = (slide_height - pic_height) // 2
+
+    # 이미지 추가
+    slide.shapes.add_picture(
+        BytesIO(image_bytes),
+        left, top,
+        width=pic_width,
+        height=pic_height
+    )
+    return slide
+
+
+# ---- 네이티브(벡터) 내보내기 ----
+EXPORT_MODES = ("image", "native")
+
+# 활성 슬라이드의 DOM을 훑어 PPT 개체 목록을 만듦 (좌표는 뷰포트 px)
+#  - box: 배경색이나 테두리가 있는 요소 → 사각형 도형
+#  - text: 블록 자식이 없는 텍스트 요소(제목/문단/목록 항목 등) → 텍스트 상자
+#  - raster: KaTeX 수식, canvas/svg/video, 수식·이미지가 섞인 텍스트 블록 → 그 영역만 잘라낸 이미지
+#  - image: <img> → 로컬 파일이면 원본 파일, 아니면 잘라낸 이미지
+EXTRACT_SLIDE_JS = """
+([selector, index]) => {
+    const slide = document.querySelectorAll(selector)[index];
+    const items = [];
+    const rectOf = el => { const r = el.getBoundingClientRect(); return [r.left, r.top, r.width, r.height]; };
+    const visible = (el, cs) => {
+        const r = el.getBoundingClientRect();
+        return cs.display !== 'none' && cs.visibility !== 'hidden' && parseFloat(cs.opacity) > 0
+            && r.width > 0 && r.height > 0 && r.bottom > 0 && r.right > 0
+            && r.top < innerHeight && r.left < innerWidth;
+    };
+    const transparent = c => c === 'transparent' || /rgba\([^)]*,\s*0\)$/.test(c);
+    const isInline = el => getComputedStyle(el).display.startsWith('inline') || el.tagName === 'BR';
+    const MEDIA = ['CANVAS', 'SVG', 'svg', 'VIDEO', 'IFRAME'];
+
+    const walk = el => {
+        const cs = getComputedStyle(el);
+        if (!visible(el, cs)) return;
+        const rect = rectOf(el);
+
+        const borderWidth = parseFloat(cs.borderTopWidth) || 0;
+        const hasBorder = borderWidth > 0 && cs.borderTopStyle !== 'none' && !transparent(cs.borderTopColor);
+        if (el !== slide && (!transparent(cs.backgroundColor) || hasBorder)) {
+            items.push({type: 'box', rect, fill: transparent(cs.backgroundColor) ? null : cs.backgroundColor,
+                        line: hasBorder ? cs.borderTopColor : null, lineWidth: borderWidth,
+                        radius: parseFloat(cs.borderTopLeftRadius) || 0});
+        }
+
+        if (MEDIA.includes(el.tagName) || el.matches('.katex-display, .katex')) {
+            items.push({type: 'raster', rect});
+            return;
+        }
+        if (el.tagName === 'IMG') {
+            items.push({type: 'image', rect, src: el.currentSrc || el.src});
+            return;
+        }
+
+        const text = el.innerText ? el.innerText.trim() : '';
+        const leaf = [...el.children].every(isInline);
+        if (text && leaf) {
+            if (el.querySelector('.katex, img, canvas, svg')) {
+                items.push({type: 'raster', rect});
+                return;
+            }
+            let prefix = '';
+            if (el.tagName === 'LI' && cs.listStyleType !== 'none') {
+                prefix = el.parentElement.tagName === 'OL'
+                    ? `${[...el.parentElement.children].indexOf(el) + 1}. ` : '• ';
+            }
+            items.push({type: 'text', rect, text: prefix + text,
+                        fontSize: parseFloat(cs.fontSize), fontFamily: cs.fontFamily,
+                        bold: parseInt(cs.fontWeight, 10) >= 600, italic: cs.fontStyle === 'italic',
+                        color: cs.color, align: cs.textAlign,
+                        lineHeight: parseFloat(cs.lineHeight) || null});
+            return;
+        }
+        for (const child of el.children) walk(child);
+    };
+
+    const slideStyle = getComputedStyle(slide);
+    let background = slideStyle.backgroundColor;
+    for (let e = slide.parentElement; transparent(background) && e; e = e.parentElement) {
+        background = getComputedStyle(e).backgroundColor;
+    }
+    walk(slide);
+    return {background: transparent(background) ? null : background, items};
+}
+"""
+
+
+TEXT_ALIGN = {"left": PP_ALIGN.LEFT, "start": PP_ALIGN.LEFT, "center": PP_ALIGN.CENTER,
+              "right": PP_ALIGN.RIGHT, "end": PP_ALIGN.RIGHT, "justify": PP_ALIGN.JUSTIFY}
+
+
+def _parse_css_color(value):
+    """'rgb(r, g, b)' / 'rgba(r, g, b, a)' → RGBColor (반투명은 흰 배경과 섞음)"""
+    m = re.match(r"rgba?\(([^)]*)\)", value or "")
+    if not m:
+        return None
+    parts = [float(v) for v in re.split(r"[,\s/]+", m.group(1).strip()) if v]
+    r, g, b = parts[:3]
+    a = parts[3] if len(parts) > 3 else 1.0
+    return RGBColor(*(round(c * a + 255 * (1 - a)) for c in (r, g, b)))
+
+
+async def extract_native_slide(page, selector, index, padding=2):
+    """
+    활성 슬라이드를 PPT 개체 목록으로 변환하고, 래스터화할 영역만 잘라서 캡처
+
+    반환: {"background": 색, "items": [...]} (raster/원격 image 항목에는 "png" 바이트가 붙음)
+    """
+    slide = await page.evaluate(EXTRACT_SLIDE_JS, [selector, index])
+    for item in slide["items"]:
+        if item["type"] == "image":
+            parsed = urlparse(item["src"])
+            path = Path(url2pathname(parsed.path)) if parsed.scheme == "file" else None
+            if path is not None and path.suffix.lower() in (".png", ".jpg", ".jpeg", ".gif", ".bmp"):
+                try:
+                    item["png"] = path.read_bytes()
+                    continue
+                except OSError:
+                    pass
+        if item["type"] in ("raster", "image"):
+            x, y, w, h = item["rect"]
+            x0, y0 = max(0, x - padding), max(0, y - padding)
+            clip = {"x": x0, "y": y0,
+                    "width": min(VIEWPORT["width"], x + w + padding) - x0,
+                    "height": min(VIEWPORT["height"], y + h + padding) - y0}
+            if clip["width"] < 1 or clip["height"] < 1:
+                continue
+            item["rect"] = [clip["x"], clip["y"], clip["width"], clip["height"]]
+            item["png"] = await page.screenshot(clip=clip)
+    return slide
+
+
+def add_native_slide(prs, slide_data):
+    """extract_native_slide() 결과를 텍스트 상자/도형/이미지로 새 슬라이드에 추가"""
+    slide = prs.slides.add_slide(prs.slide_layouts[6])  # 빈 레이아웃
+    scale = prs.slide_width / VIEWPORT["width"]  # px → EMU
+    pt_per_px = scale / 12700  # 1pt = 12700 EMU
+
+    def emu_rect(rect):
+        x, y, w, h = rect
+        return Emu(round(x * scale)), Emu(round(y * scale)), Emu(max(1, round(w * scale))), Emu(max(1, round(h * scale)))
+
+    background = _parse_css_color(slide_data["background"])
+    if background is not None:
+        slide.background.fill.solid()
+        slide.background.fill.fore_color.rgb = background
+
+    for item in slide_data["items"]:
+        kind = item["type"]
+        if kind == "box":
+            shape = slide.shapes.add_shape(
+                MSO_SHAPE.ROUNDED_RECTANGLE if item["radius"] > 0 else MSO_SHAPE.RECTANGLE, *emu_rect(item["rect"]))
+            if item["radius"] > 0:
+                shape.adjustments[0] = min(0.5, item["radius"] / max(1.0, min(item["rect"][2:])))
+            fill = _parse_css_color(item["fill"])
+            if fill is None:
+                shape.fill.background()
+            else:
+                shape.fill.solid()
+                shape.fill.fore_color.rgb = fill
+            line = _parse_css_color(item["line"])
+            if line is None:
+                shape.line.fill.background()
+            else:
+                shape.line.color.rgb = line
+                shape.line.width = Emu(round(item["lineWidth"] * scale))
+            shape.shadow.inherit = False
+        elif kind == "text":
+            box = slide.shapes.add_textbox(*emu_rect(item["rect"]))
+            frame = box.text_frame
+            frame.word_wrap = True
+            frame.auto_size = MSO_AUTO_SIZE.NONE
+            frame.margin_left = frame.margin_right = frame.margin_top = frame.margin_bottom = 0
+            color = _parse_css_color(item["color"])
+            family = item["fontFamily"].split(",")[0].strip().strip("'\"")
+            for i, line in enumerate(item["text"].split("\n")):
+                para = frame.paragraphs[0] if i == 0 else frame.add_paragraph()
+                para.alignment = TEXT_ALIGN.get(item["align"], PP_ALIGN.LEFT)
+                if item["lineHeight"]:
+                    para.line_spacing = Pt(item["lineHeight"] * pt_per_px)
+                run = para.add_run()
+                run.text = line
+                font = run.font
+                font.size = Pt(item["fontSize"] * pt_per_px)
+                font.bold = item["bold"]
+                font.italic = item["italic"]
+                font.name = family
+                if color is not None:
+                    font.color.rgb = color
+        elif "png" in item:
+            left, top, width, height = emu_rect(item["rect"])
+            slide.shapes.add_picture(BytesIO(item["png"]), left, top, width=width, height=height)
+    return slide
+
+
+# ---- 이미지 압축 / 중복 제거 ----
+def dhash(img, size=8):
+    """차이 해시(dHash): 흑백 (size+1)x size 축소 이미지에서 가로로 이웃한 픽셀 밝기 비교 → 64비트 정수"""
+    small = img.convert("L").resize((size + 1, size), Image.BILINEAR)
+    px = list(small.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            bits = (bits << 1) | (px[row * (size + 1) + col] > px[row * (size + 1) + col + 1])
+    return bits
+
+
+def psnr(a, b):
+    """두 RGB 이미지의 PSNR(dB), 완전히 같으면 inf"""
+    rms = ImageStat.Stat(ImageChops.difference(a, b)).rms
+    mse = sum(r * r for r in rms) / len(rms)
+    return math.inf if mse == 0 else 10 * math.log10(255 * 255 / mse)
 
-    # 각 이미지를 슬라이드로 추가
-    for i, img_path in enumerate(screenshot_paths, 1):
-        print(f"➕ 슬라이드 {i}/{total_slides} 추가 중...")
 
-        # 빈 슬라이드 추가
-        blank_slide_layout = prs.slide_layouts[6]  # 빈 레이아웃
-        slide = prs.slides.add_slide(blank_slide_layout)
+class ImageOptimizer:
+    """
+    슬라이드 PNG를 PPT에 넣기 전에 더 작은 인코딩으로 바꾸고 중복 슬라이드를 합침
+
+    mode:
+        "png"      원본 PNG 그대로
+        "lossless" 무손실만 (PNG 재압축, 256색 이하 슬라이드는 팔레트 PNG)
+        "auto"     화질(PSNR)이 min_psnr 이상인 후보 중 가장 작은 것
+                   (무손실 PNG / 256색 팔레트 양자화 PNG / JPEG)
+    같은 이미지나, 직전 recent장 중 dHash 거리가 near_dup_distance 이하이고 모든 픽셀 차이가
+    near_dup_max_diff 이하인 거의 같은 이미지는 먼저 만든 바이트를 그대로 재사용합니다.
+    python-pptx는 이미지 파트를 SHA1로 구분하므로 같은 바이트는 PPT 안에 한 번만 저장됩니다.
+    WebP는 PowerPoint 이미지 파트로 넣을 수 없어 후보에서 제외했습니다.
+    """
+
+    MODES = ("png", "lossless", "auto")
+
+    def __init__(self, mode="auto", jpeg_quality=85, min_psnr=40.0,
+                 near_dup_distance=4, near_dup_max_diff=8, recent=4):
+        if mode not in self.MODES:
+            raise ValueError(f"지원하지 않는 압축 모드: {mode} (가능: {', '.join(self.MODES)})")
+        self.mode = mode
+        self.jpeg_quality = jpeg_quality
+        self.min_psnr = min_psnr
+        self.near_dup_distance = near_dup_distance
+        self.near_dup_max_diff = near_dup_max_diff
+        self.recent = recent
+
+        self._by_sha1 = {}     # 원본 PNG SHA1 → (출력 바이트, 크기)
+        self._recent = []      # [(dHash, RGB 이미지, 출력 바이트, 크기)] 최근 몇 장만 보관
+        self._parts = set()    # PPT에 실제로 들어가는 서로 다른 출력 바이트의 SHA1
+        self.stats = {"slides": 0, "duplicates": 0, "input_bytes": 0, "output_bytes": 0, "formats": {}}
+
+    def process(self, png):
+        """원본 PNG 바이트 → (PPT에 넣을 이미지 바이트, (너비, 높이))"""
+        self.stats["slides"] += 1
+        self.stats["input_bytes"] += len(png)
+        if self.mode == "png":
+            return self._emit(png, png_size(png), "png")
+
+        key = hashlib.sha1(png).digest()
+        if key in self._by_sha1:
+            self.stats["duplicates"] += 1
+            return self._by_sha1[key]
+
+        img = Image.open(BytesIO(png)).convert("RGB")
+        h = dhash(img)
+        for other_hash, other, data, size in self._recent:
+            if (bin(h ^ other_hash).count("1") <= self.near_dup_distance and other.size == img.size
+                    and max(hi for _, hi in ImageChops.difference(img, other).getextrema()) <= self.near_dup_max_diff):
+                self.stats["duplicates"] += 1
+                self._by_sha1[key] = (data, size)
+                return data, size
+
+        data, fmt = self._encode(img, png)
+        result = self._emit(data, img.size, fmt)
+        self._by_sha1[key] = result
+        self._recent = (self._recent + [(h, img, data, img.size)])[-self.recent:]
+        return result
+
+    def _encode(self, img, png):
+        candidates = [(png, "png")]
+
+        buf = BytesIO()
+        img.save(buf, "PNG", optimize=True)
+        candidates.append((buf.getvalue(), "png"))
+
+        # 256색 이하면 팔레트 PNG가 무손실, 그보다 많으면 auto 모드에서만 화질 기준을 만족할 때 사용
+        exact_palette = img.getcolors(256) is not None
+        if exact_palette or self.mode == "auto":
+            pal = img.quantize(colors=256, method=Image.Quantize.MEDIANCUT if not exact_palette
+                               else Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+            if psnr(img, pal.convert("RGB")) >= (math.inf if self.mode == "lossless" else self.min_psnr):
+                buf = BytesIO()
+                pal.save(buf, "PNG", optimize=True)
+                candidates.append((buf.getvalue(), "png-palette"))
+
+        if self.mode == "auto":
+            buf = BytesIO()
+            img.save(buf, "JPEG", quality=self.jpeg_quality, optimize=True, progressive=True)
+            jpeg = buf.getvalue()
+            if psnr(img, Image.open(BytesIO(jpeg)).convert("RGB")) >= self.min_psnr:
+                candidates.append((jpeg, "jpeg"))
+
+        return min(candidates, key=lambda c: len(c[0]))
+
+    def _emit(self, data, size, fmt):
+        digest = hashlib.sha1(data).digest()
+        if digest not in self._parts:
+            self._parts.add(digest)
+            self.stats["output_bytes"] += len(data)
+            self.stats["formats"][fmt] = self.stats["formats"].get(fmt, 0) + 1
+        return data, size
+
+    def report(self):
+        st = self.stats
+        saved = st["input_bytes"] - st["output_bytes"]
+        ratio = saved / st["input_bytes"] if st["input_bytes"] else 0.0
+        formats = ", ".join(f"{k} {v}" for k, v in sorted(st["formats"].items()))
+        return (f"🗜️ 이미지 {st['input_bytes'] / 1e6:.1f}MB → {st['output_bytes'] / 1e6:.1f}MB "
+                f"({saved / 1e6:.1f}MB, {ratio:.0%} 절약) | 중복 {st['duplicates']}장 | {formats}")
+
+
+# ---- 추가 출력 (같은 캡처에서 PDF / 썸네일 스프라이트) ----
+class PdfSink:
+    """캡처 PNG를 한 장씩 PDF 페이지로 이어 붙임 (페이지 크기는 PPT와 같은 16x9인치)"""
+
+    def __init__(self, path, quality=92):
+        self.path = str(path)
+        self.quality = quality
+        self.pages = 0
+
+    def add(self, png):
+        img = Image.open(BytesIO(png)).convert("RGB")
+        img.save(self.path, "PDF", resolution=img.width / 16, quality=self.quality, append=self.pages > 0)
+        self.pages += 1
+
+    def close(self):
+        if self.pages:
+            print(f"📄 PDF 저장: {self.path} ({self.pages}쪽)")
 
-        # 이미지 크기 조정 및 추가
-        img = Image.open(img_path)
-        img_width, img_height = img.size
 
-        # 슬라이드 크기에 맞게 조정
-        slide_width = prs.slide_width
-        slide_height = prs.slide_height
+class SpriteSheet:
+    """슬라이드 썸네일을 격자로 모은 스프라이트 이미지 (썸네일만 메모리에 보관)"""
 
-        # 비율 유지하면서 슬라이드에 맞추기
-        img_ratio = img_width / img_height
-        slide_ratio = slide_width / slide_height
+    def __init__(self, path, thumb_width=320, columns=8, background=(255, 255, 255)):
+        self.path = str(path)
+        self.thumb_width = thumb_width
+        self.columns = columns
+        self.background = background
+        self.thumbs = []
 
-        if img_ratio > slide_ratio:
-            # 이미지가 더 넓음 - 너비에 맞춤
-            pic_width = slide_width
-            pic_height = int(slide_width / img_ratio)
+    def add(self, png):
+        img = Image.open(BytesIO(png))
+        img.draft("RGB", (self.thumb_width, self.thumb_width))
+        img = img.convert("RGB")
+        img.thumbnail((self.thumb_width, self.thumb_width * img.height // img.width), Image.LANCZOS)
+        self.thumbs.append(img)
+
+    def close(self):
+        if not self.thumbs:
+            return
+        w = max(t.width for t in self.thumbs)
+        h = max(t.height for t in self.thumbs)
+        cols = min(self.columns, len(self.thumbs))
+        rows = -(-len(self.thumbs) // cols)
+        sheet = Image.new("RGB", (cols * w, rows * h), self.background)
+        for i, thumb in enumerate(self.thumbs):
+            sheet.paste(thumb, ((i % cols) * w, (i // cols) * h))
+        sheet.save(self.path, optimize=True)
+        print(f"🖼️ 스프라이트 저장: {self.path} ({cols}x{rows}, 썸네일 {w}x{h})")
+
+
+def _image_slide_adder(optimizer=None, sinks=()):
+    """
+    캡처 PNG를 (optimizer가 있으면 압축/중복 제거 후) 이미지 슬라이드로 추가하는 함수
+    sinks(PdfSink, SpriteSheet 등)에도 같은 원본 PNG를 순서대로 넘깁니다.
+    """
+    def add(prs, png):
+        if optimizer is not None:
+            image, size = optimizer.process(png)
+        else:
+            image, size = png, png_size(png)
+        add_image_slide(prs, image, size)
+        for sink in sinks:
+            sink.add(png)
+    return add
+
+
+async def _assemble(queue, prs, total_slides, add_slide, claims, cached=(), load_cached=None):
+    """
+    큐에서 슬라이드를 받아 번호 순서대로 PPT에 추가 (캡처와 동시에 진행)
+
+    캡처는 순서가 섞여 도착하므로 다음 차례가 올 때까지 잠깐 reorder 버퍼에 보관합니다.
+    슬라이드를 추가할 때마다 claims의 차례를 옮기므로 버퍼는 claims.window개를 넘지 않습니다.
+    cached에 든 번호는 큐로 받지 않고 차례가 왔을 때 load_cached(번호)로 읽으므로
+    캐시된 이미지가 한꺼번에 메모리에 올라오지 않습니다.
+    add_slide(prs, 캡처 결과)는 스레드에서 실행되어 이벤트 루프의 캡처를 막지 않습니다.
+    """
+    pending = {}
+    next_num = 1
+    while next_num <= total_slides:
+        if next_num in cached:
+            result = await asyncio.to_thread(load_cached, next_num)
+        elif next_num in pending:
+            result = pending.pop(next_num)
         else:
-            # 이미지가 더 높음 - 높이에 맞춤
-            pic_height = slide_height
-            pic_width = int(slide_height * img_ratio)
-
-        # 중앙 정렬
-        left = (slide_width - pic_width) // 2
-        top = (slide_height - pic_height) // 2
-
-        # 이미지 추가
-        slide.shapes.add_picture(
-            str(img_path),
-            left, top,
-            width=pic_width,
-            height=pic_height
-        )
+            slide_num, result = await queue.get()
+            pending[slide_num] = result
+            continue
+        print(f"➕ 슬라이드 {next_num}/{total_slides} 추가 중...")
+        await asyncio.to_thread(add_slide, prs, result)
+        next_num += 1
+        await claims.advance(next_num)
+
+
+async def convert_deck(browser, html_path, prs, total_slides=None, workers=4,
+                       ready_timeout_ms=15000, transition_timeout_ms=3000, queue_size=None, cache=None,
+                       page_slots=None, optimize="auto", mode="image", sinks=()):
+    """
+    이미 실행 중인 browser로 덱 하나를 캡처하면서 곧바로 prs에 슬라이드로 추가
+
+    - 첫 페이지에서 슬라이드 선택자/개수/번호 기준을 자동으로 찾습니다. total_slides를 주면 그 수만큼 캡처합니다.
+    - 페이지 workers개가 남은 슬라이드 번호를 앞에서부터 하나씩 가져가 캡처하므로
+      슬라이드가 거의 순서대로 도착하고 순서 맞춤용 버퍼가 작게 유지됩니다.
+    - 캡처 결과는 최대 queue_size(기본 workers*2)개까지만 큐에 쌓이고, 조립 차례에서 그만큼 앞선
+      슬라이드까지만 캡처하므로 한 슬라이드가 늦어져도 순서 맞춤용 버퍼가 그 이상 커지지 않습니다.
+    - cache(SlideCache)를 주면 슬라이드별 캐시 키를 계산해, 내용이 그대로인
+      슬라이드는 캐시된 이미지를 쓰고 바뀐 슬라이드만 캡처합니다. 캐시 정리(evict)는
+      같은 캐시를 쓰는 덱이 모두 끝난 뒤 호출하는 쪽에서 한 번 합니다.
+    - page_slots(asyncio.Semaphore)를 주면 여러 덱이 동시에 여는 캡처 페이지 수를 그 안으로 제한합니다.
+    - optimize: 이미지 압축/중복 제거 모드 (ImageOptimizer 참고, None이면 원본 PNG)
+    - mode: "image"면 슬라이드 전체를 이미지로, "native"면 텍스트/도형을 PPT 개체로 내보냄
+      (native에서는 캐시와 이미지 압축을 쓰지 않음)
+    - sinks: 같은 캡처 PNG를 받을 추가 출력들 (PdfSink, SpriteSheet). 끝나면 close()를 호출합니다.
+    """
+    if mode not in EXPORT_MODES:
+        raise ValueError(f"지원하지 않는 내보내기 모드: {mode} (가능: {', '.join(EXPORT_MODES)})")
+    if mode == "native":
+        cache, optimize = None, None
+    file_url = f"file://{os.path.abspath(html_path).replace(os.sep,'/')}"
+    queue = asyncio.Queue(maxsize=queue_size or workers * 2)
+
+    # 첫 페이지는 덱 분석/캐시 키 계산에 쓰고 그대로 첫 번째 캡처 페이지로 재사용
+    if page_slots is not None:
+        await page_slots.acquire()
+    try:
+        first = await _open_deck(browser, file_url, ready_timeout_ms)
+    except BaseException:
+        if page_slots is not None:
+            page_slots.release()
+        raise
+
+    try:
+        deck = await detect_deck(first[1])
+        if deck is None:
+            if total_slides is None:
+                raise ValueError(f"showSlide()로 넘기는 슬라이드를 찾지 못했습니다: {html_path}")
+            deck = {"selector": ".slide", "count": total_slides, "offset": 1}
+        if total_slides is None:
+            total_slides = deck["count"]
+        print(f"📊 {html_path}: 총 {total_slides}개 슬라이드 ({deck['selector']}, 동시 캡처 {workers}개)")
+
+        cached, on_captured, load_cached = set(), None, None
+        keys = None
+        if cache is not None:
+            keys = await slide_cache_keys(first[1], total_slides, deck["selector"])
+        if keys is not None:
+            # 여기서는 있는지만 확인 (사용 시각 갱신), 내용은 조립 차례가 왔을 때 읽음
+            cached = {n for n, key in enumerate(keys, 1) if cache.touch(key)}
+
+            def read_cached(slide_num):
+                png = cache.get(keys[slide_num - 1])
+                if png is None:
+                    raise RuntimeError(f"캐시 파일이 변환 도중 삭제되었습니다 (슬라이드 {slide_num}). 다시 실행하세요.")
+                return png
+
+            def store_captured(slide_num, png):
+                cache.put(keys[slide_num - 1], png)
+
+            load_cached, on_captured = read_cached, store_captured
+        elif cache is not None:
+            print("⚠️ 슬라이드 요소 수가 총 슬라이드 수와 달라 캐시를 사용하지 않습니다.")
+    except BaseException:
+        await first[0].close()
+        if page_slots is not None:
+            page_slots.release()
+        raise
+
+    missing = [n for n in range(1, total_slides + 1) if n not in cached]
+    if cached:
+        print(f"♻️ 캐시 재사용 {len(cached)}개, 새로 캡처 {len(missing)}개")
+
+    claims = _ClaimWindow(missing, queue.maxsize)
+    n_workers = max(1, min(workers, len(missing)))
+    optimizer = ImageOptimizer(optimize) if optimize else None
+    if mode == "native":
+        selector = deck["selector"]
+
+        async def capture(page, slide_num):
+            slide_data = await extract_native_slide(page, selector, slide_num - 1)
+            # 추가 출력이 있으면 같은 상태에서 전체 화면도 함께 캡처
+            return slide_data, (await _screenshot_slide(page, slide_num) if sinks else None)
+
+        def add_slide(prs, result):
+            slide_data, png = result
+            add_native_slide(prs, slide_data)
+            for sink in sinks:
+                sink.add(png)
+    else:
+        capture, add_slide = _screenshot_slide, _image_slide_adder(optimizer, sinks)
+
+    tasks = [_assemble(queue, prs, total_slides, add_slide, claims, cached, load_cached)]
+    for k in range(n_workers):
+        tasks.append(_capture_worker(browser, file_url, claims, queue, total_slides, deck["offset"],
+                                     ready_timeout_ms, transition_timeout_ms,
+                                     opened=first if k == 0 else None, on_captured=on_captured,
+                                     slot=page_slots, capture=capture))
+    await asyncio.gather(*tasks)
+    if optimizer is not None:
+        print(optimizer.report())
+    for sink in sinks:
+        await asyncio.to_thread(sink.close)
+    return prs
+
+
+async def capture_slides(html_path, total_slides, prs, workers=4, **kwargs):
+    """브라우저를 새로 띄워 덱 하나를 변환 (convert_deck 참고)"""
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            return await convert_deck(browser, html_path, prs, total_slides, workers, **kwargs)
+        finally:
+            await browser.close()
+
+
+def extra_outputs(pptx_path, pdf=False, sprite=False):
+    """PPT 경로 기준으로 PDF(.pdf)/스프라이트(_sprite.png) 출력 목록을 만듦"""
+    pptx_path = Path(pptx_path)
+    sinks = []
+    if pdf:
+        sinks.append(PdfSink(pptx_path.with_suffix(".pdf")))
+    if sprite:
+        sinks.append(SpriteSheet(pptx_path.with_name(pptx_path.stem + "_sprite.png")))
+    return sinks
+
+
+# ---- 일괄 변환 ----
+def find_decks(root):
+    """root 아래에서 showSlide()를 정의한 HTML 파일을 찾음"""
+    for path in sorted(Path(root).rglob("*.html")):
+        if SHOW_SLIDE_RE.search(path.read_text(encoding="utf-8", errors="ignore")):
+            yield path
+
+
+def deck_output_name(deck_path, root):
+    """Teacher/MathEdu/Tractrix/Presentation.html → Teacher_MathEdu_Tractrix_Presentation.pptx"""
+    rel = Path(deck_path).resolve().relative_to(Path(root).resolve())
+    return "_".join(rel.with_suffix("").parts) + ".pptx"
+
+
+async def convert_all(decks, root, output_dir, browsers=2, max_pages=None, workers=4, cache=None,
+                      optimize="auto", mode="image", pdf=False, sprite=False):
+    """
+    여러 덱을 미리 띄워 둔 브라우저 풀에서 동시에 변환
+
+    browsers개의 Chromium을 한 번만 띄워 덱을 번갈아 배정하고, 전체 캡처 페이지 수는
+    max_pages(기본 CPU 코어 수)로 제한합니다. pdf/sprite가 True면 PPT 옆에 같은 이름의
+    .pdf / _sprite.png도 만듭니다. 반환값은 {덱 경로: 출력 경로 또는 예외}.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    page_slots = asyncio.Semaphore(max_pages or os.cpu_count() or 1)
+
+    async with async_playwright() as p:
+        pool = await asyncio.gather(*(p.chromium.launch(headless=True) for _ in range(max(1, browsers))))
+
+        async def convert_one(i, deck_path):
+            out = output_dir / deck_output_name(deck_path, root)
+            prs = await convert_deck(pool[i % len(pool)], deck_path, new_presentation(), workers=workers,
+                                     cache=cache, page_slots=page_slots, optimize=optimize, mode=mode,
+                                     sinks=extra_outputs(out, pdf, sprite))
+            await asyncio.to_thread(prs.save, out)
+            print(f"✅ {deck_path} → {out}")
+            return out
+
+        try:
+            results = await asyncio.gather(*(convert_one(i, d) for i, d in enumerate(decks)),
+                                           return_exceptions=True)
+        finally:
+            await asyncio.gather(*(browser.close() for browser in pool))
+
+    # 다른 덱이 아직 읽을 캐시 파일을 지우지 않도록 모든 덱이 끝난 뒤 한 번만 정리
+    if cache is not None:
+        cache.evict()
+    return dict(zip(decks, results))
+
+
+def capture_slides_to_ppt(html_path, output_ppt_path, total_slides=None, workers=4, cache_dir=".slide_cache",
+                          optimize="auto", mode="image", pdf=False, sprite=False):
+    """
+    HTML 슬라이드를 캡처하여 PPT 파일로 생성
+
+    Args:
+        html_path: HTML 파일 경로
+        output_ppt_path: 출력 PPT 파일 경로
+        total_slides: 총 슬라이드 수 (None이면 DOM에서 자동 감지)
+        workers: 동시에 캡처할 페이지 수
+        cache_dir: 슬라이드 캐시 폴더 (None이면 캐시 없이 전부 캡처)
+        optimize: 이미지 압축 모드 ("png", "lossless", "auto")
+        mode: "image"(슬라이드 전체 이미지) 또는 "native"(텍스트/도형을 PPT 개체로)
+        pdf: True면 같은 캡처로 PDF도 생성 (PPT와 같은 이름, .pdf)
+        sprite: True면 썸네일 스프라이트 시트도 생성 (<이름>_sprite.png)
+    """
+
+    print(f"🚀 슬라이드 캡처 시작: {html_path}")
+
+    # Playwright로 브라우저 실행, 캡처와 PPT 조립을 함께 진행
+    start = time.perf_counter()
+    cache = SlideCache(cache_dir) if cache_dir else None
+    prs = asyncio.run(capture_slides(html_path, total_slides, new_presentation(), workers, cache=cache,
+                                     optimize=optimize, mode=mode,
+                                     sinks=extra_outputs(output_ppt_path, pdf, sprite)))
+    print(f"⏱️ 캡처/조립 시간: {time.perf_counter() - start:.1f}s")
+    if cache is not None:
+        cache.evict()
 
     # PPT 파일 저장
     prs.save(output_ppt_path)
     print(f"\n✅ 완료! PPT 파일 생성: {output_ppt_path}")
 
-    # 임시 파일 정리
-    print("\n🧹 임시 파일 정리 중...")
-    for img_path in screenshot_paths:
-        img_path.unlink()
-    temp_folder.rmdir()
-
     print("✨ 모든 작업 완료!")
 
 
-if __name__ == "__main__":
-    # 설정
-    HTML_FILE = r"Teacher\MathEdu\TractrixPresentation.html"
-    OUTPUT_PPT = "Tractrix_Presentation.pptx"
-    TOTAL_SLIDES = 51
+# 설정
+HTML_FILE = os.path.join("Teacher", "MathEdu", "Tractrix", "Presentation.html")
+OUTPUT_PPT = "Tractrix_Presentation.pptx"
+
 
-    # 실행
-    capture_slides_to_ppt(HTML_FILE, OUTPUT_PPT, TOTAL_SLIDES)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTML 슬라이드 → PPT 변환")
+    parser.add_argument("html", nargs="?", default=HTML_FILE, help="변환할 HTML 덱")
+    parser.add_argument("-o", "--output", default=None, help="출력 PPT 경로 (일괄 변환이면 출력 폴더)")
+    parser.add_argument("--slides", type=int, default=None, help="총 슬라이드 수 (기본: 자동 감지)")
+    parser.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1), help="덱당 동시 캡처 페이지 수")
+    parser.add_argument("--cache-dir", default=".slide_cache", help="슬라이드 캐시 폴더 ('' 이면 사용 안 함)")
+    parser.add_argument("--optimize", choices=ImageOptimizer.MODES, default="auto",
+                        help="이미지 압축 모드 (png: 원본, lossless: 무손실, auto: 화질 기준 내 최소 크기)")
+    parser.add_argument("--mode", choices=EXPORT_MODES, default="image",
+                        help="image: 슬라이드 전체를 이미지로, native: 텍스트/도형을 PPT 개체로 (수식/캔버스만 이미지)")
+    parser.add_argument("--pdf", action="store_true", help="같은 캡처로 PDF도 저장")
+    parser.add_argument("--sprite", action="store_true", help="썸네일 스프라이트 시트도 저장")
+    parser.add_argument("--batch", metavar="ROOT", default=None,
+                        help="ROOT 아래 showSlide()를 쓰는 모든 덱을 일괄 변환")
+    parser.add_argument("--browsers", type=int, default=2, help="일괄 변환 시 브라우저 풀 크기")
+    parser.add_argument("--max-pages", type=int, default=None, help="일괄 변환 시 전체 동시 페이지 수 (기본: CPU 코어 수)")
+    args = parser.parse_args(argv)
+
+    if args.batch is None:
+        capture_slides_to_ppt(args.html, args.output or OUTPUT_PPT, args.slides, args.workers, args.cache_dir or None,
+                              args.optimize, args.mode, args.pdf, args.sprite)
+        return 0
+
+    decks = list(find_decks(args.batch))
+    print(f"🔎 덱 {len(decks)}개 발견")
+    cache = SlideCache(args.cache_dir) if args.cache_dir else None
+    start = time.perf_counter()
+    results = asyncio.run(convert_all(decks, args.batch, args.output or "ppt_export", args.browsers,
+                                      args.max_pages, args.workers, cache, args.optimize, args.mode,
+                                      args.pdf, args.sprite))
+    failed = {deck: err for deck, err in results.items() if isinstance(err, BaseException)}
+    for deck, err in failed.items():
+        print(f"❌ {deck}: {err}")
+    print(f"\n✨ {len(results) - len(failed)}/{len(results)}개 덱 변환 완료 ({time.perf_counter() - start:.1f}s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())